@@ -1,8 +1,157 @@
 import streamlit as st
+import asset_sources
+import backtest
+import charts
+import covariance
 import data_finance_verte as dfv
+import esg
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+import monte_carlo
+import optimizer
+import rolling
+import screening
+import streaming
+import queue
+import threading
+import time
+from stats_cache import StatsCache, make_key
+
+
+# Cache des statistiques partagé entre toutes les sessions du serveur Streamlit
+@st.cache_resource
+def get_stats_cache():
+    return StatsCache(maxsize=32)
+
+
+# Rendu des graphiques (pool de threads et cache d'images), lui aussi partagé entre les sessions
+@st.cache_resource
+def get_chart_renderer():
+    return charts.ChartRenderer(maxsize=64)
+
+
+# ------------------------------
+# Diagnostic du cache (barre latérale)
+# ------------------------------
+def show_cache_diagnostics():
+    cache = get_stats_cache()
+    with st.sidebar.expander("Diagnostic du cache"):
+        diagnostics = cache.diagnostics()
+        st.write(f"Entrées : {diagnostics['entries']} / {diagnostics['maxsize']}")
+        st.write(f"Succès : {diagnostics['hits']} — Échecs : {diagnostics['misses']} ({diagnostics['hit_rate']:.0%} de succès)")
+        st.write(f"Temps de calcul cumulé : {diagnostics['compute_seconds']:.2f} s (dernier : {diagnostics['last_compute_seconds']:.2f} s)")
+        images = get_chart_renderer().cache.diagnostics()
+        st.write(f"Graphiques en cache : {images['entries']} / {images['maxsize']} ({images['hit_rate']:.0%} de succès)")
+        if st.button("Vider le cache"):
+            cache.invalidate()
+            get_chart_renderer().cache.invalidate()
+            st.rerun()
+
+# ------------------------------
+# Suivi en direct (page Performances)
+# ------------------------------
+# Pause entre deux exécutions du script pendant le suivi en direct (secondes)
+LIVE_REFRESH = 1.0
+
+
+def _feed_worker(feed, events, stop):
+    # Thread de fond : le flux (et ses attentes entre deux interrogations) ne bloque pas le script
+    # Streamlit ; les événements sont déposés dans une file lue à chaque exécution
+    try:
+        for event in feed:
+            if stop.is_set():
+                break
+            events.put(event)
+    except Exception as error:
+        # L'erreur est transmise au script pour être affichée, au lieu d'arrêter le thread en silence
+        events.put(error)
+    finally:
+        events.put(None)
+
+
+def stop_live_tracking():
+    live = st.session_state.pop("live_tracking", None)
+    if live is not None:
+        live["stop"].set()
+
+
+def show_live_tracking(tickers, start_date, end_date):
+    source = st.radio("Source des cours", ["Rejeu des 20 dernières séances", "Marché (Yahoo Finance)"], horizontal=True)
+    max_updates = 500
+
+    if not source.startswith("Rejeu"):
+        # En direct, l'historique va jusqu'à la dernière séance terminée : le premier cours interrogé
+        # suit immédiatement la dernière clôture connue
+        end_date = pd.Timestamp.today().strftime("%Y-%m-%d")
+
+    # Le flux et l'état du suivi sont conservés dans la session d'une exécution à l'autre
+    key = (source, tuple(tickers), start_date, end_date)
+    live = st.session_state.get("live_tracking")
+    if live is None or live["key"] != key:
+        stop_live_tracking()
+        prices = dfv.load_market_data(tickers, start_date, end_date).prices
+        spx_prices = dfv.load_market_data("^SPX", start_date, end_date).prices
+
+        if source.startswith("Rejeu"):
+            # Le flux rejoue les dernières séances à partir de l'état calculé sur l'historique antérieur
+            stream = streaming.PortfolioStream(prices.iloc[:-20], spx_prices.loc[:prices.index[-21]])
+            feed = streaming.ReplayFeed(prices.iloc[-20:], spx_prices, delay=0.5)
+        else:
+            stream = streaming.PortfolioStream(prices, spx_prices)
+            # Les séries périodiques (SCPI, OAT verte) ne sont pas cotées chez Yahoo : elles ne sont pas
+            # interrogées et gardent leur dernière valeur
+            periodic = dfv.periodic_tickers(stream.tickers)
+            polled = [t for t in stream.tickers if t not in periodic]
+            feed = streaming.PollingFeed(dfv.get_price_store().provider, polled, interval=60.0, start=stream.last_date)
+
+        live = st.session_state["live_tracking"] = {
+            "key": key, "stream": stream, "events": queue.Queue(), "stop": threading.Event(),
+            "last": {}, "updates": 0, "done": False,
+        }
+        threading.Thread(target=_feed_worker, args=(feed, live["events"], live["stop"]), daemon=True).start()
+
+    # Événements arrivés depuis la dernière exécution, traités sans attendre le flux
+    stream = live["stream"]
+    while not live["done"] and live["updates"] < max_updates:
+        try:
+            event = live["events"].get_nowait()
+        except queue.Empty:
+            break
+        if event is None:
+            live["done"] = True
+            break
+        if isinstance(event, Exception):
+            live["error"] = event
+            continue
+        update = stream.process(event)
+        if update is not None:
+            live["updates"] += 1
+            live["last"][update["type"]] = update
+            live["last"]["any"] = update
+
+    col1, col2, col3 = st.columns(3)
+    update = live["last"].get("any")
+    if update is not None:
+        col1.metric("Valeur du portefeuille", f"{update['cumulative_value']:.3f}", f"{update['portfolio_return']:+.2%}")
+    bar = live["last"].get("bar")
+    if bar is not None:
+        rolling_63 = bar["metrics"]["rolling"][63]
+        col2.metric("Volatilité 63 j", f"{rolling_63['volatility']:.2f}")
+        col3.metric("Bêta 63 j vs S&P 500", f"{rolling_63['beta']:.2f}")
+    # Seule la dernière année glissante est renvoyée au navigateur
+    st.line_chart(stream.recent_cumulative_returns(250))
+
+    if live["done"] or live["updates"] >= max_updates:
+        live["stop"].set()
+        if live.get("error") is not None:
+            st.error(f"Flux de cours interrompu : {live['error']}")
+        else:
+            st.caption("Suivi terminé.")
+    else:
+        # Nouvelle exécution après une courte pause : les autres widgets restent utilisables
+        time.sleep(LIVE_REFRESH)
+        st.rerun()
+
 
 # ------------------------------
 # Page d'accueil : Vue Globale
@@ -10,12 +159,6 @@ import matplotlib.pyplot as plt
 def show_home():
     st.title("Green Asset Management - Portefeuille Vert")
     
-    tickers = dfv.tickers  
-    start_date = "2019-01-01"
-    end_date = "2024-12-31"
-    wallet_stats = dfv.get_wallet_statistics(tickers, start=start_date, end=end_date)
-    
-    
     st.markdown("""
     ### ♻️ Bienvenue sur notre application de suivi du **Portefeuille Vert**
 
@@ -120,137 +263,72 @@ def show_criterias():
    
     ---
     """)
-    
+
+    # Application des critères aux données ESG (data/esg.csv)
+    st.subheader("Résultat de la sélection")
+    report = screening.screen().report()
+    excluded = report[~report["selected"]]
+    st.markdown(f"{int(report['selected'].sum())} actifs retenus sur {len(report)}.")
+    if len(excluded):
+        st.dataframe(excluded[["asset_class", "reasons"]].rename(
+            columns={"asset_class": "Classe d'actif", "reasons": "Motifs d'exclusion"}))
+
 
 # ------------------------------
 # Page Détails du Portefeuille
 # ------------------------------
+HOLDING_SECTIONS = {
+    "equity": "🏢 **Actions durables**",
+    "fund": "🌍 **Fonds & ETF ESG**",
+    "bond": "💸 **Obligations vertes**",
+    "scpi": "🏠 **SCPI responsables**",
+}
+
+
+def holdings_markdown(esg_data, portfolio):
+    lines = []
+    for asset_class, title in HOLDING_SECTIONS.items():
+        holdings = [t for t in portfolio if t in esg_data and esg_data.record(t)["asset_class"] == asset_class]
+        if not holdings:
+            continue
+        lines.append(f"#### {title}")
+        for ticker in holdings:
+            name = esg_data.record(ticker)["name"] or ticker
+            lines.append(f"- **{name}**" if name == ticker else f"- **{name} ({ticker})**")
+        lines.append("")
+    lines += ["---", "", "Pour en savoir plus sur chaque actif, sélectionnez un titre dans le menu déroulant ci-dessous."]
+    return "\n".join(lines)
+
+
 def show_details():
     st.title("Détails du Portefeuille depuis 2019")
 
     st.subheader("Un portefeuille aligné avec les objectifs de l'accord de Paris")
-    temperatures = [1.4, 1.3, 1.5, 1.4, 1.5, 1.3, 1.5, 1.5]
-    st.markdown(f"Température implicite de la partie Actions du portefeuille : {np.mean(temperatures):.2f}°C ✅")
+    esg_data = esg.load_esg()
+    portfolio = screening.portfolio_tickers()
+    weights = np.full(len(portfolio), 1 / len(portfolio))
+    # Seuls les actifs ayant une température implicite (les actions) entrent dans la moyenne pondérée
+    temperature = esg_data.weighted_temperature(weights, portfolio)
+    st.markdown(f"Température implicite de la partie Actions du portefeuille : {temperature:.2f}°C ✅")
     st.markdown("Nous pondérons la température implicite de chaque actif en fonction de sa part dans le portefeuille. (notre portefeuille est équipondéré)")
 
     st.subheader("Composition actuelle du portefeuille vert")
     
     st.markdown("Le portefeuille est construit selon une répartition équipondérée entre l’ensemble des valeurs qu’il contient.")
     
-    st.markdown("""
-    #### 🏢 **Actions durables**
-    - **MICROSOFT CORPORATION (MSFT)** 
-    - **L’OREAL SA (OR)** 
-    - **BOUYGUES SA (EN)** 
-    - **CARREFOUR SA (CA)**
-    - **UNILEVER PLC (ULVR)** 
-    - **SCHNEIDER ELECTRIC SE (SU)** 
-    - **SAP SE (SAP)** 
-    - **ALLIANZ SE (ALV.DE)** 
-
-    #### 🌍 **Fonds & ETF ESG**
-    - **AMUNDI EURO GOVERNMENT GREEN BOND UCITS ETF ACC (EART.L)** 
-    - **Invesco MSCI World ESG Climate Paris Aligned UCITS ETF Acc (PAWD.L)** 
-
-    #### 💸 **Obligations vertes**
-    - **Obligations Assimilables au Trésor (OAT) vertes France**
-
-    #### 🏠 **SCPI responsables**
-    - **SCPI Accimmo Pierre, BNP Paribas REIM** 
-
-    ---
-
-    Pour en savoir plus sur chaque actif, sélectionnez un titre dans le menu déroulant ci-dessous.
-
-    """)
+    # Composition construite à partir des actifs retenus par les critères de sélection
+    st.markdown(holdings_markdown(esg_data, portfolio))
     
-    # Liste des tickers 
-    tickers = ["MSFT", "OR", "EN.PA", "CA", "UL", "SU", "SAP", "ALV.DE", "EART.L", "PAWD.L", "SCPI Accimmo Pierre"]
+    # Liste des tickers (données ESG structurées, voir data/esg.csv)
+    tickers = list(esg_data.tickers)
 
     # Sélection d'un titre parmi ceux composant le portefeuille
     selected_ticker = st.selectbox("Sélectionnez un titre", tickers)
 
-    # Dictionnaire associant une description spécifique à chaque titre
-    ticker_descriptions = {
-        "MSFT": """Nom : Microsoft Corporation  
-- Objectif de décarbonation : Oui, objectif fixé à 2045, couvrant l’intégralité des émissions (Scopes 1, 2 et 3), avec un engagement clair, crédible et transparent  
-- Température implicite : 1,4°C — indique une trajectoire alignée avec les objectifs climatiques internationaux de 1,5°C
-- Note ESG MSCI : A. Microsoft se situe dans la moyenne parmi 460 entreprises du secteur des logiciels et des services.  
-- Controverses ESG : Environnement: G (green, très bien), Social : Y (yellow : modéré), Gouvernance : Y (yellow : modéré)
-- Activités controversées : Aucune implication dans des activités controversées selon MSCI
-""",
-        "OR": """Nom : L’Oréal SA  
-- Objectif de décarbonation : Oui, objectif fixé à 2050, couvrant 100 % des émissions (Scopes 1, 2 et 3), avec un plan compréhensible  
-- Température implicite : 1,3°C — trajectoire alignée avec les objectifs climatiques internationaux  
-- Note ESG MSCI : AA. L’Oréal est reconnue comme un leader dans la gestion de ses enjeux ESG  
-- Controverses ESG : Environnement : G (green, très bien), Social : O (orange, modéré à élevé), Gouvernance : G (green, très bien)  
-- Activités controversées : Aucune implication dans des activités controversées selon MSCI
-""",
-        "EN.PA": """Nom : Bouygues SA  
-- Objectif de décarbonation : Oui, objectif fixé à 2050, couvrant 97 % des émissions (Scopes 1, 2 et 3), avec un plan compréhensible  
-- Température implicite : 1,5°C — trajectoire alignée avec les objectifs climatiques internationaux  
-- Note ESG MSCI : AA. Bouygues est reconnue comme un leader dans la gestion de ses enjeux ESG  
-- Controverses ESG : Environnement : G (green, très bien), Social : O (orange, modéré à élevé), Gouvernance : G (green, très bien)  
-- Activités controversées : Aucune implication dans des activités controversées selon MSCI
-""",
-        "CA": """Nom : Carrefour SA  
-- Objectif de décarbonation : Oui, objectif fixé à 2040, couvrant 100 % des émissions (Scopes 1, 2 et 3), avec un plan compréhensible  
-- Température implicite : 1,4°C — trajectoire alignée avec les objectifs climatiques internationaux  
-- Note ESG MSCI : AA. Carrefour est reconnu comme un leader dans la gestion de ses enjeux ESG  
-- Controverses ESG : Environnement : Y (yellow, modéré), Social : O (orange, modéré à élevé), Gouvernance : G (green, très bien)  
-- Activités controversées : Implication dans les secteurs du tabac et de l’alcool. Maintenu dans le portefeuille car sa note ESG est supérieure ou égale à AA, conformément à notre politique de sélection
-""",
-        "UL": """Nom : Unilever PLC  
-- Objectif de décarbonation : Oui, objectif fixé à 2040, couvrant 100 % des émissions (Scopes 1, 2 et 3), avec un plan compréhensible  
-- Température implicite : 1,5°C — trajectoire alignée avec les objectifs climatiques internationaux  
-- Note ESG MSCI : AAA. Unilever est considéré comme un exemple en matière de gestion des enjeux ESG  
-- Controverses ESG : Environnement : O (orange, modéré à élevé), Social : Y (yellow, modéré), Gouvernance : G (green, très bien)  
-- Activités controversées : Aucune implication dans des activités controversées selon MSCI
-""",
-        "SU": """Nom : Schneider Electric SE  
-- Objectif de décarbonation : Oui, objectif fixé à 2040, couvrant 100 % des émissions (Scopes 1, 2 et 3), avec un plan compréhensible  
-- Température implicite : 1,3°C — trajectoire alignée avec les objectifs climatiques internationaux  
-- Note ESG MSCI : AAA. Schneider Electric est un leader mondial reconnu pour la qualité de sa gestion ESG  
-- Controverses ESG : Environnement : G (green, très bien), Social : O (orange, modéré à élevé), Gouvernance : G (green, très bien)  
-- Activités controversées : Aucune implication dans des activités controversées selon MSCI
-""",
-        "SAP": """Nom : SAP SE  
-- Objectif de décarbonation : Oui, objectif fixé à 2030, couvrant 100 % des émissions (Scopes 1, 2 et 3), avec un plan compréhensible  
-- Température implicite : 1,5°C — trajectoire alignée avec les objectifs climatiques internationaux  
-- Note ESG MSCI : AA. SAP est reconnu comme un leader dans la gestion de ses enjeux ESG  
-- Controverses ESG : Environnement : G (green, très bien), Social : O (orange, modéré à élevé), Gouvernance : G (green, très bien)  
-- Activités controversées : Aucune implication dans des activités controversées selon MSCI
-""",
-        "ALV.DE": """Nom : ALLIANZ SE
-- Objectif de décarbonation : Oui, objectif fixé à 2050, couvrant 100 % des émissions (Scopes 1, 2 et 3), avec un plan compréhensible  
-- Température implicite : 1,5°C — trajectoire alignée avec les objectifs climatiques internationaux  
-- Note ESG MSCI : AA. Allianz est reconnu comme un leader dans la gestion de ses enjeux ESG   
-- Controverses ESG : Environnement : G (green, très bien), Social : Y (yellow, modéré), Gouvernance : Y (yellow, modéré)  
-- Activités controversées : Aucune implication dans des activités controversées selon MSCI
-""",
-        "EART.L": """- Nom : AMUNDI EURO GOVERNMENT GREEN BOND UCITS ETF ACC  
-- Émetteur : Amundi   
-- ISIN : LU2356220926  
-- Label : Article 9 SFDR   
-- Objectif d'investissement : Ce fond a pour objectif de répliquer l’indice Solactive Euro Government Green Bond Index. Cet indice représente la performance des obligations vertes de qualité “investment grade“ émises par des pays européens et libellées en EUR. Les obligations vertes sont émises à des fins de financement de projets avec un impact positif sur l’environnement. Pour être éligible à l’indice, une obligation doit être considérée comme ‘obligation verte’ par la Climate Bonds Initiative et répondre à certains critères spécifiques.""",
-        
-        "PAWD.L": """- Nom : Invesco MSCI World ESG Climate Paris Aligned UCITS ETF Acc    
-- Émetteur : Invesco     
-- ISIN : IE000V93BNU0  
-- Label : Article 9 SFDR   
-- Objectf d'investissement : Cet ETF vise à fournir la performance de rendement total net de l'indice MSCI World ESG Climate Paris Aligned Benchmark Select (l'" indice de référence "). L'indice de référence suit la performance des entreprises de moyenne et grande capitalisation des marchés développés du monde entier et vise à réduire l'exposition aux risques climatiques physiques et transitoires, tout en poursuivant les opportunités découlant de la transition vers une économie à faible émission de carbone, conformément aux exigences de l'Accord de Paris. En outre, l'indice de référence offre une exposition aux entreprises présentant des métriques ESG élevées, intègre les recommandations de la Task Force on Climate Related Financial Disclosures (TCFD) et est conçu pour dépasser les normes minimales de l'indice de référence aligné sur Paris de l'UE, telles que définies dans le règlement délégué (UE) 2020/1818 de la Commission.""",
-       
-       "SCPI Accimmo Pierre": """- Nom : SCPI Accimmo Pierre   
-- Émetteur : BNP Paribas REIM    
-- Label : ISR
-- Objectf d'investissement : Accimmo Pierre adopte une approche “best-in-progress”, visant à améliorer la performance ESG de ses actifs existants. Elle investit notamment dans des immeubles récents de haute qualité, dont certains sont certifiés HQE. Par exemple, son acquisition du siège du Conseil Régional d’Île-de-France, livré début 2020, bénéficie de la certification HQE Conception “Excellent”.""",
-       
-    }
-
     # Affichage de l'analyse détaillée du titre sélectionné
     st.markdown(f"### Analyse détaillée du titre : {selected_ticker}")
-    if selected_ticker in ticker_descriptions:
-        st.write(ticker_descriptions[selected_ticker])
+    if selected_ticker in esg_data:
+        st.write(esg_data.describe(selected_ticker))
     else:
         st.write("Aucune description disponible pour ce titre actuellement.")
 
@@ -267,13 +345,23 @@ def show_performances():
     # Définition de la période d'analyse
     start_date = "2019-01-01"
     end_date = "2024-12-31"
-    tickers = dfv.tickers  # La liste des actifs du portefeuille
+    tickers = screening.portfolio_tickers()  # Les actifs cotés retenus par nos critères de sélection
     
-    # Récupération des statistiques du portefeuille
-    wallet_stats = dfv.get_wallet_statistics(tickers, start=start_date, end=end_date)
+    # Récupération des statistiques du portefeuille (mises en cache entre les sessions)
+    cache = get_stats_cache()
+    # Portefeuille et S&P 500 téléchargés ensemble, en parallèle, plutôt que l'un après l'autre ;
+    # les actifs sans cours sont retirés du portefeuille plutôt que de vider tout le panel
+    missing = cache.get_or_compute(
+        make_key("prefetch", list(tickers) + ["^SPX"], start_date, end_date),
+        lambda: dfv.prefetch_prices(list(tickers) + ["^SPX"], start_date, end_date),
+    )
+    if missing:
+        st.warning(f"Cours indisponibles pour : {', '.join(missing)}")
+        tickers = [t for t in tickers if t not in missing]
+    wallet_stats = cache.wallet_statistics(tickers, start=start_date, end=end_date)
 
     # Récupération des données du S&P 500 et calcul de ses rendements
-    spx_data = dfv.get_stock_statistics("^SPX", start=start_date, end=end_date)["returns"]
+    spx_data = cache.stock_statistics("^SPX", start=start_date, end=end_date)["returns"]
     
     # Affichage des indicateurs clés via des "metrics"
     st.subheader("Statistiques Clés")
@@ -283,63 +371,135 @@ def show_performances():
     col3.metric("Ratio de Sharpe", f"{wallet_stats['portfolio_sharpe_ratio']:.2f}")
 
     st.subheader("Performances de la SCPI")    
-    # Affichage des performances de la SCPI   
+    # Affichage des performances de la SCPI (taux publiés, voir data/periodic_returns.csv)
     st.markdown("Rendements annuels")
-    st.markdown("2019 : 4,01%  \n  2020 : 3,81%  \n  2021 : 4,61%  \n  2022 : 3,80%  \n  2023 : 3,51%")
+    scpi_returns = asset_sources.load_periodic_returns().periodic_returns("SCPI Accimmo Pierre")
+    st.markdown("  \n  ".join(f"{date.year} : {value:.2%}".replace(".", ",") for date, value in scpi_returns.items()))
     
     # Section graphique
     st.subheader("Graphiques")
-    
-    # Graphique 1 : Histogramme des rendements annuels moyens par actif
-    fig1, ax1 = plt.subplots(figsize=(8, 4))
-    mean_returns = wallet_stats["mean_annual_returns"]
-    ax1.bar(mean_returns.index, mean_returns.values)
-    ax1.set_title("Rendements annuels moyens par Actif")
-    ax1.set_ylabel("Rendement annuel (%)")
-    ax1.set_xlabel("Actif")
-    st.pyplot(fig1)
-    
-    # Graphique 2 : Heatmap de la matrice de corrélation
-    fig2, ax2 = plt.subplots(figsize=(8, 6))
-    corr_matrix = wallet_stats["correlation_matrix"]
-    cax = ax2.imshow(corr_matrix, interpolation='nearest', cmap='coolwarm')
-    fig2.colorbar(cax)
-    ax2.set_xticks(np.arange(len(corr_matrix.columns)))
-    ax2.set_yticks(np.arange(len(corr_matrix.index)))
-    ax2.set_xticklabels(corr_matrix.columns, rotation=90)
-    ax2.set_yticklabels(corr_matrix.index)
-    ax2.set_title("Matrice de Corrélation", pad=20)
-    st.pyplot(fig2)
-    
-    # Calcul de la performance du portefeuille équipondéré
-    daily_returns = wallet_stats["daily_returns"]
-
-    # Moyenne simple des rendements disponibles chaque jour
-    portfolio_daily_returns = daily_returns.mean(axis=1, skipna=True)
-
-    # Performance cumulée du portefeuille
-    portfolio_cumulative_returns = (1 + portfolio_daily_returns).cumprod()
+    # Les images sont dessinées en arrière-plan pendant la suite des calculs puis affichées dans
+    # leurs emplacements, une fois prêtes ; la version interactive n'envoie que des séries allégées
+    renderer = get_chart_renderer()
+    interactive = st.toggle("Graphiques interactifs (séries allégées)")
+    pending = []
 
-    # Calcul de la performance cumulée du S&P 500
-    spx_cumulative_returns = (1 + spx_data).cumprod()
+    def show_chart(name, draw, *data, **kwargs):
+        pending.append((st.empty(), renderer.submit(name, draw, *data, **kwargs)))
 
-    # Création du graphique
-    fig3, ax3 = plt.subplots(figsize=(10, 5))
-
-    # Tracer la performance cumulée du portefeuille
-    portfolio_cumulative_returns.plot(ax=ax3, label="Portefeuille", color="blue")
+    # Graphique 1 : Histogramme des rendements annuels moyens par actif
+    show_chart("mean_returns", charts.mean_returns_bar, wallet_stats["mean_annual_returns"], figsize=(8, 4))
 
-    # Tracer la performance cumulée du S&P 500
-    spx_cumulative_returns.plot(ax=ax3, label="S&P 500", color="red")
+    # Graphique 2 : Heatmap de la matrice de corrélation
+    show_chart("correlation", charts.correlation_heatmap, wallet_stats["correlation_matrix"], figsize=(8, 6))
 
-    # Ajouter un titre, un label et une légende
-    ax3.set_title("Performance du Portefeuille Équipondéré vs S&P 500")
-    ax3.set_ylabel("Valeur du Portefeuille")
-    ax3.set_xlabel("Date")
-    ax3.legend()
+    daily_returns = wallet_stats["daily_returns"]
 
-    # Affichage du graphique dans Streamlit
-    st.pyplot(fig3)
+    # Graphique 3 : Backtest du portefeuille équipondéré (dérive des poids, rééquilibrage et coûts)
+    col1, col2 = st.columns(2)
+    schedule = col1.selectbox("Rééquilibrage", ["monthly", "quarterly", "threshold"],
+                              format_func=lambda s: {"monthly": "Mensuel", "quarterly": "Trimestriel",
+                                                     "threshold": "Sur seuil (écart de 5 %)"}[s])
+    cost_bps = col2.number_input("Coûts de transaction (points de base)", min_value=0, max_value=100, value=10)
+    result = cache.get_or_compute(
+        make_key(f"backtest_{schedule}_{cost_bps}", tickers, start_date, end_date),
+        lambda: backtest.backtest_wallet(wallet_stats, spx_data, schedule=schedule, cost=cost_bps / 10_000, threshold=0.05),
+    )
+    if interactive:
+        st.line_chart(charts.downsample(pd.concat([result["value"], result["benchmark_value"].rename("S&P 500")], axis=1)))
+    else:
+        show_chart("performance", charts.performance_chart, result["value"], result["benchmark_value"])
+
+    summary = result["summary"]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Rendement annualisé", f"{summary['cagr']:.2%}", f"{summary['cagr'] - summary['benchmark_cagr']:+.2%} vs S&P 500")
+    col2.metric("Rééquilibrages", f"{summary['n_rebalances']:.0f}")
+    col3.metric("Rotation annuelle", f"{summary['annual_turnover']:.1%}")
+    col4.metric("Coûts cumulés", f"{summary['total_costs']:.2%}")
+
+    # Graphique 4 : Frontière efficiente (sans vente à découvert)
+    st.subheader("Frontière efficiente")
+    estimator = st.selectbox("Estimateur de covariance", covariance.ESTIMATORS,
+                             format_func=lambda e: {"sample": "Empirique", "ledoit_wolf": "Ledoit-Wolf (rétrécissement)",
+                                                    "ewma": "Exponentielle (EWMA)", "factor": "Modèle à facteurs"}[e])
+    # La SCPI et l'OAT verte n'ont qu'un rendement publié par période : leur volatilité journalière
+    # lissée est quasi nulle et l'optimiseur y placerait tout le portefeuille. La frontière et la
+    # simulation Monte Carlo ne portent donc que sur les actifs cotés.
+    periodic = set(dfv.periodic_tickers(tickers))
+    market_tickers = [t for t in tickers if t not in periodic]
+    if periodic:
+        st.caption(f"Actifs cotés uniquement (hors {', '.join(sorted(periodic))}, dont les rendements lissés "
+                   "sous-estiment le risque).")
+    frontier_stats = cache.wallet_statistics(market_tickers, start=start_date, end=end_date, estimator=estimator)
+    optimal = cache.get_or_compute(
+        make_key(f"frontier_{estimator}", market_tickers, start_date, end_date),
+        lambda: optimizer.optimize_wallet(frontier_stats, n_points=100),
+    )
+    min_variance = optimal["min_variance"]
+    max_sharpe = optimal["max_sharpe"]
+    show_chart(
+        "frontier", charts.frontier_chart, optimal["frontier"],
+        (min_variance["annual_volatility"], min_variance["annual_return"]),
+        (max_sharpe["annual_volatility"], max_sharpe["annual_return"]),
+        (frontier_stats["portfolio_annual_volatility"], frontier_stats["portfolio_annual_return"]),
+    )
+
+    # Composition des portefeuilles optimaux
+    st.markdown("Poids des portefeuilles optimaux")
+    st.dataframe(pd.DataFrame({
+        "Variance minimale": min_variance["weights"],
+        "Sharpe maximal": max_sharpe["weights"],
+    }).style.format("{:.1%}"))
+
+    # Graphique 5 : Indicateurs de risque glissants face au S&P 500
+    st.subheader("Risque glissant")
+    window = st.selectbox("Fenêtre glissante", [63, 252], format_func=lambda w: f"{w} jours de bourse")
+    risk = cache.get_or_compute(
+        make_key(f"rolling_{window}", tickers, start_date, end_date),
+        lambda: rolling.rolling_metrics(daily_returns, spx_data, window=window),
+    )
+
+    # Graphique 6 : Drawdown du portefeuille depuis son plus haut historique
+    if interactive:
+        st.line_chart(charts.downsample(risk[["volatility", "sharpe_ratio", "beta"]]))
+        st.area_chart(charts.downsample(risk["drawdown"], how="min"))
+    else:
+        show_chart(f"rolling_{window}", charts.rolling_chart, risk[["volatility", "sharpe_ratio", "beta"]], window=window,
+                   figsize=(10, 8))
+        show_chart("drawdown", charts.drawdown_chart, risk["drawdown"], figsize=(10, 3))
+
+    # Graphique 7 : Simulation Monte Carlo (VaR / CVaR et cône de percentiles)
+    st.subheader("Simulation Monte Carlo")
+    if periodic:
+        st.caption("Partie cotée du portefeuille, équipondérée.")
+    market_stats = cache.wallet_statistics(market_tickers, start=start_date, end=end_date)
+    col1, col2, col3 = st.columns(3)
+    method = col1.radio("Méthode", ["parametric", "bootstrap"],
+                        format_func=lambda m: "Paramétrique" if m == "parametric" else "Bootstrap historique")
+    horizon = col2.slider("Horizon (années)", 1, 10, 10)
+    n_paths = col3.selectbox("Trajectoires", [100_000, 1_000_000], format_func=lambda n: f"{n:,}".replace(",", " "))
+    simulation = cache.get_or_compute(
+        make_key(f"monte_carlo_{method}_{horizon}_{n_paths}", market_tickers, start_date, end_date),
+        lambda: monte_carlo.simulate_wallet(market_stats, method=method, horizon_years=horizon, n_paths=n_paths, seed=0),
+    )
+    show_chart("monte_carlo", charts.monte_carlo_fan, simulation["percentiles"], simulation["n_paths"])
+
+    confidence = f"{simulation['confidence']:.0%}"
+    st.dataframe(pd.DataFrame({
+        f"VaR {confidence}": simulation["var"],
+        f"CVaR {confidence}": simulation["cvar"],
+    }).rename_axis("Horizon (années)").style.format("{:.1%}"))
+
+    # Affichage des images dans l'ordre de la page
+    for placeholder, future in pending:
+        placeholder.image(future.result())
+
+    # Suivi en direct : mise à jour incrémentale des performances et du risque
+    st.subheader("Suivi en direct")
+    if st.toggle("Activer le suivi en direct"):
+        show_live_tracking(tickers, start_date, end_date)
+    else:
+        stop_live_tracking()
 
 # ------------------------------
 # Navigation via la barre latérale
@@ -354,3 +514,5 @@ elif page == "Détails du portefeuille 📋":
     show_details()
 elif page == "Performances 📈":
     show_performances()
+
+show_cache_diagnostics()
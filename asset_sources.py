@@ -0,0 +1,102 @@
+# Sources de rendements pour les actifs non cotés (SCPI, OAT vertes détenues jusqu'à l'échéance).
+#
+# Ces actifs n'ont qu'un rendement par période (annuelle, trimestrielle ou mensuelle), lu dans un
+# CSV local. Chaque rendement est réparti uniformément, en composé, sur les jours ouvrés de sa
+# période, puis converti en niveau d'indice (base 1) sur le calendrier journalier du panel de marché.
+# dfv.load_market_data traite ensuite ces niveaux comme des cours pour les rendements et la
+# performance cumulée. Ces rendements lissés ont une volatilité quasi nulle, sans rapport avec le
+# risque réel de ces actifs : la page Performances les écarte de la frontière efficiente et de la
+# simulation Monte Carlo (dfv.periodic_tickers).
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PERIODIC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "periodic_returns.csv")
+
+PERIOD_LENGTHS = {
+    "A": pd.DateOffset(years=1),
+    "Q": pd.DateOffset(months=3),
+    "M": pd.DateOffset(months=1),
+}
+
+
+def _day(values):
+    return np.asarray(values, dtype="datetime64[D]")
+
+
+class PeriodicReturnSource:
+    def __init__(self, frame, extend=False):
+        # `frame` : colonnes ticker, frequency (A, Q ou M), period_end, return (en décimal).
+        # Par défaut, aucun rendement n'est inventé après la dernière période publiée : les niveaux
+        # y sont NaN (le panel les prolonge à plat). Avec `extend`, le dernier rendement connu est
+        # prolongé (par exemple sur l'année en cours, avant la publication du taux de distribution).
+        frame = frame.assign(period_end=pd.to_datetime(frame["period_end"])).sort_values(["ticker", "period_end"])
+        unknown = set(frame["frequency"]) - set(PERIOD_LENGTHS)
+        if unknown:
+            raise ValueError(f"Fréquences inconnues : {sorted(unknown)} (attendu {sorted(PERIOD_LENGTHS)})")
+        starts = pd.Series(pd.NaT, index=frame.index, dtype="datetime64[ns]")
+        for frequency, length in PERIOD_LENGTHS.items():
+            rows = frame["frequency"] == frequency
+            starts[rows] = pd.DatetimeIndex(frame.loc[rows, "period_end"]) - length
+        # Périodes contiguës : le début est la fin de la période précédente (30 juin - 3 mois = 30 mars)
+        starts = np.maximum(starts, frame.groupby("ticker")["period_end"].shift().fillna(starts))
+
+        self.frame = frame.assign(period_start=starts)
+        self.extend = extend
+        self.tickers = list(dict.fromkeys(frame["ticker"]))
+        self._periods = {ticker: group for ticker, group in self.frame.groupby("ticker", sort=False)}
+
+    @classmethod
+    def from_csv(cls, path=DEFAULT_PERIODIC_PATH, **kwargs):
+        return cls(pd.read_csv(path, encoding="utf-8"), **kwargs)
+
+    def covers(self, ticker):
+        return ticker in self._periods
+
+    def periodic_returns(self, ticker):
+        # Rendements tels que publiés, indexés par fin de période
+        periods = self._periods[ticker]
+        return pd.Series(periods["return"].to_numpy(), index=pd.DatetimeIndex(periods["period_end"]), name=ticker)
+
+    def _daily_rates(self, ticker, dates):
+        periods = self._periods[ticker]
+        starts, ends = _day(periods["period_start"]), _day(periods["period_end"])
+        # Taux journalier composé : (1 + R) ^ (1 / jours ouvrés de la période) - 1, jours de (début, fin]
+        n_days = np.maximum(np.busday_count(starts + 1, ends + 1), 1)
+        rates = np.power(1 + periods["return"].to_numpy(dtype=np.float64), 1 / n_days) - 1
+
+        # Période de chaque date : la première dont la fin est postérieure ou égale à la date
+        k = np.searchsorted(ends, dates, side="left")
+        last = len(ends) - 1
+        inside = dates > starts[np.minimum(k, last)]
+        daily = np.where(inside, rates[np.minimum(k, last)], np.nan)
+        if self.extend:
+            daily[k > last] = rates[last]
+        else:
+            daily[k > last] = np.nan
+        return daily
+
+    def daily_returns(self, tickers, dates):
+        dates = pd.DatetimeIndex(dates)
+        days = _day(dates.normalize())
+        values = np.column_stack([self._daily_rates(t, days) for t in tickers]) if len(tickers) else np.empty((len(dates), 0))
+        return pd.DataFrame(values, index=dates, columns=list(tickers))
+
+    def prices(self, tickers, dates):
+        # Niveaux d'indice base 1 sur le calendrier `dates` ; NaN hors des périodes connues
+        returns = self.daily_returns(tickers, dates)
+        values = returns.to_numpy()
+        levels = np.cumprod(1 + np.nan_to_num(values), axis=0)
+        # La veille de la première date couverte sert de base 1 : le premier rendement n'est pas perdu
+        covered = np.cumsum(~np.isnan(values), axis=0)
+        levels[np.vstack([covered[1:], covered[-1:]]) == 0] = np.nan
+        # Après la dernière date couverte, le niveau est inconnu
+        levels[(covered == covered[-1:]) & np.isnan(values)] = np.nan
+        return pd.DataFrame(levels, index=returns.index, columns=returns.columns)
+
+
+@lru_cache(maxsize=4)
+def load_periodic_returns(path=DEFAULT_PERIODIC_PATH):
+    return PeriodicReturnSource.from_csv(path)
@@ -0,0 +1,256 @@
+# Backtest du portefeuille : rééquilibrage périodique ou sur seuil, dérive des poids entre deux
+# rééquilibrages, coûts de transaction et rotation, comparaison avec l'indice de référence.
+#
+# Entre deux rééquilibrages, chaque actif évolue selon sa croissance cumulée depuis le dernier
+# rééquilibrage : avec L la somme cumulée des log(1 + r), la valeur d'un segment est
+# exp(L_t - L_début) @ w. Tout l'historique est donc calculé en une passe matricielle, pour un
+# ou plusieurs vecteurs de poids à la fois ; seule la détection des franchissements de seuil
+# avance de rééquilibrage en rééquilibrage (par blocs de dates, jamais jour par jour).
+#
+# backtest_grid répartit une grille de paramètres (calendrier, coûts, seuil, poids) sur un pool
+# de processus ; les rendements sont transmis une seule fois à chaque processus.
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+
+import parallel
+import timing
+from data_finance_verte import ANNUAL_FACTOR, RISK_FREE_RATE
+from rolling import align_returns
+
+SCHEDULES = ("monthly", "quarterly", "threshold", "daily", "buy_and_hold")
+# Nombre de dates examinées par le premier bloc de recherche du prochain franchissement de seuil
+_THRESHOLD_BLOCK = 16
+
+
+def _log_growth(returns):
+    # L[p] : log de la croissance de chaque actif jusqu'à la clôture du jour p - 1 (L[0] = 0)
+    values = np.log1p(np.maximum(np.asarray(returns, dtype=np.float64), -1 + 1e-12))
+    return np.vstack([np.zeros(values.shape[1]), np.cumsum(values, axis=0)])
+
+
+def calendar_boundaries(dates, schedule):
+    # Positions (dans L) des rééquilibrages : à la clôture du dernier jour de bourse de chaque période
+    n = len(dates)
+    if schedule == "daily":
+        return np.arange(1, n)
+    if schedule == "buy_and_hold":
+        return np.array([], dtype=np.intp)
+    frequency = {"monthly": "M", "quarterly": "Q"}[schedule]
+    periods = pd.DatetimeIndex(dates).to_period(frequency).asi8
+    return np.flatnonzero(periods[:-1] != periods[1:]) + 1
+
+
+def threshold_boundaries(growth, weights, threshold):
+    # Rééquilibrage dès qu'un poids s'écarte de plus de `threshold` de sa cible.
+    # `growth` : exp(L), calculé une fois pour toutes les combinaisons de la grille.
+    weights = np.asarray(weights, dtype=np.float64)
+    n = len(growth) - 1
+    boundaries = []
+    start = 0
+    while start < n - 1:
+        found = None
+        block, size = start + 1, _THRESHOLD_BLOCK
+        while block < n:
+            end = min(block + size, n)
+            relative = weights * (growth[block:end] / growth[start])
+            drift = relative / relative.sum(axis=1, keepdims=True)
+            crossed = np.flatnonzero(np.abs(drift - weights).max(axis=1) > threshold)
+            if len(crossed):
+                found = block + crossed[0]
+                break
+            # Blocs de taille croissante : un seuil serré est trouvé vite, un seuil large sans trop d'itérations
+            block, size = end, size * 2
+        if found is None or found >= n:
+            break
+        boundaries.append(found)
+        start = found
+    return np.array(boundaries, dtype=np.intp)
+
+
+def _simulate(log_growth, W, boundaries, costs):
+    # Valeur de P portefeuilles (poids cibles W : P x N) rééquilibrés aux positions `boundaries`.
+    # Renvoie les valeurs (T + 1) x P, la rotation et les coûts à chaque rééquilibrage (K x P).
+    n = len(log_growth) - 1
+    starts = np.concatenate([[0], boundaries]).astype(np.intp)
+    positions = np.arange(1, n + 1)
+    segment = np.searchsorted(starts, positions, side="left") - 1
+
+    relative = np.exp(log_growth[1:] - log_growth[starts[segment]])   # T x N
+    gross = relative @ W.T                                             # T x P
+
+    # Poids dérivés à la veille de chaque rééquilibrage, puis rotation vers la cible
+    end_relative = relative[boundaries - 1]                            # K x N
+    end_gross = gross[boundaries - 1]                                  # K x P
+    drift = W[None, :, :] * end_relative[:, None, :] / end_gross[:, :, None]
+    turnover = np.abs(drift - W[None, :, :]).sum(axis=2)               # K x P
+    cost_fraction = costs[None, :] * turnover
+
+    # Valeur au début de chaque segment (après coûts), puis valeur de chaque jour
+    segment_values = np.vstack([np.ones(len(W)), np.cumprod(end_gross * (1 - cost_fraction), axis=0)])
+    values = np.empty((n + 1, len(W)))
+    values[0] = 1.0
+    values[1:] = segment_values[segment] * gross
+    values[boundaries] = segment_values[1:]
+    return values, turnover, cost_fraction
+
+
+def _summary(values, turnover, cost_fraction, benchmark_returns, annual_factor, risk_free_rate):
+    # Indicateurs de chaque portefeuille (colonnes de `values`)
+    daily = values[1:] / values[:-1] - 1
+    n_days = len(daily)
+    years = n_days / annual_factor
+    annual_return = daily.mean(axis=0) * annual_factor
+    annual_volatility = daily.std(axis=0, ddof=1) * np.sqrt(annual_factor)
+    drawdown = values / np.maximum.accumulate(values, axis=0) - 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        summary = {
+            "annual_return": annual_return,
+            "cagr": values[-1] ** (1 / years) - 1,
+            "annual_volatility": annual_volatility,
+            "sharpe_ratio": (annual_return - risk_free_rate) / annual_volatility,
+            "max_drawdown": drawdown.min(axis=0),
+            "n_rebalances": np.full(values.shape[1], len(turnover)),
+            "annual_turnover": turnover.sum(axis=0) / years,
+            "total_costs": 1 - np.prod(1 - cost_fraction, axis=0),
+        }
+        if benchmark_returns is not None:
+            excess = daily - benchmark_returns[:, None]
+            tracking_error = excess.std(axis=0, ddof=1) * np.sqrt(annual_factor)
+            benchmark_value = np.prod(1 + benchmark_returns)
+            summary["benchmark_cagr"] = np.full(values.shape[1], benchmark_value ** (1 / years) - 1)
+            summary["excess_return"] = excess.mean(axis=0) * annual_factor
+            summary["tracking_error"] = tracking_error
+            summary["information_ratio"] = summary["excess_return"] / tracking_error
+    return summary
+
+
+def _prepare(returns, benchmark):
+    if benchmark is not None:
+        returns, benchmark = align_returns(returns, benchmark)
+        benchmark = benchmark.to_numpy(dtype=np.float64)
+    return returns, benchmark
+
+
+@timing.timed("backtest")
+def backtest(returns, weights=None, schedule="monthly", cost=0.001, threshold=0.05, benchmark=None,
+             annual_factor=ANNUAL_FACTOR, risk_free_rate=RISK_FREE_RATE):
+    # Backtest d'un portefeuille sur un DataFrame de rendements journaliers (dates x actifs).
+    # `cost` : coût proportionnel au montant échangé (0.001 = 10 points de base).
+    returns, benchmark_returns = _prepare(returns, benchmark)
+    n_assets = returns.shape[1]
+    if weights is None:
+        weights = np.full(n_assets, 1 / n_assets)
+    weights = np.asarray(weights, dtype=np.float64)
+
+    log_growth = _log_growth(returns.to_numpy())
+    if schedule == "threshold":
+        boundaries = threshold_boundaries(np.exp(log_growth), weights, threshold)
+    elif schedule in SCHEDULES:
+        boundaries = calendar_boundaries(returns.index, schedule)
+    else:
+        raise ValueError(f"Calendrier inconnu : {schedule!r} (attendu parmi {SCHEDULES})")
+
+    values, turnover, cost_fraction = _simulate(log_growth, weights[None, :], boundaries, np.array([cost]))
+    summary = _summary(values, turnover, cost_fraction, benchmark_returns, annual_factor, risk_free_rate)
+
+    dates = returns.index
+    value = pd.Series(values[1:, 0], index=dates, name="Portefeuille")
+    rebalance_dates = dates[boundaries - 1]
+    result = {
+        "value": value,
+        "returns": value.pct_change().fillna(value.iloc[0] - 1),
+        "rebalances": rebalance_dates,
+        "turnover": pd.Series(turnover[:, 0], index=rebalance_dates, name="turnover"),
+        "costs": pd.Series(cost_fraction[:, 0], index=rebalance_dates, name="costs"),
+        "summary": {key: float(v[0]) for key, v in summary.items()},
+    }
+    if benchmark_returns is not None:
+        result["benchmark_value"] = pd.Series(np.cumprod(1 + benchmark_returns), index=dates, name="Indice")
+    return result
+
+
+# ------------------------------
+# Grilles de paramètres
+# ------------------------------
+def parameter_grid(schedules=("monthly", "quarterly", "threshold"), costs=(0.0, 0.001, 0.0025),
+                   thresholds=(0.02, 0.05, 0.1), weights=None):
+    # Produit cartésien des paramètres ; le seuil n'est varié que pour le calendrier "threshold".
+    # `weights` : liste de vecteurs de poids (None = équipondéré).
+    weights = [None] if weights is None else list(weights)
+    grid = []
+    for schedule, cost, w in itertools.product(schedules, costs, range(len(weights))):
+        for threshold in (thresholds if schedule == "threshold" else (None,)):
+            grid.append({"schedule": schedule, "cost": cost, "threshold": threshold, "weights": weights[w]})
+    return grid
+
+
+_worker = {}
+
+
+def _init_worker(log_growth, dates, benchmark_returns, annual_factor, risk_free_rate):
+    _worker.update(log_growth=log_growth, growth=np.exp(log_growth), dates=dates, benchmark_returns=benchmark_returns,
+                   annual_factor=annual_factor, risk_free_rate=risk_free_rate)
+
+
+def _run_chunk(chunk):
+    # Exécuté dans un processus du pool : les combinaisons d'un même calendrier sont simulées ensemble
+    log_growth, dates = _worker["log_growth"], _worker["dates"]
+    n_assets = log_growth.shape[1]
+    rows = {}
+    groups = {}
+    for index, params in chunk:
+        weights = params["weights"]
+        weights = np.full(n_assets, 1 / n_assets) if weights is None else np.asarray(weights, dtype=np.float64)
+        if params["schedule"] == "threshold":
+            boundaries = threshold_boundaries(_worker["growth"], weights, params["threshold"])
+            groups[("threshold", index)] = (boundaries, [(index, weights, params["cost"])])
+        else:
+            key = (params["schedule"], None)
+            if key not in groups:
+                groups[key] = (calendar_boundaries(dates, params["schedule"]), [])
+            groups[key][1].append((index, weights, params["cost"]))
+
+    for boundaries, members in groups.values():
+        indices = [m[0] for m in members]
+        W = np.array([m[1] for m in members])
+        costs = np.array([m[2] for m in members], dtype=np.float64)
+        values, turnover, cost_fraction = _simulate(log_growth, W, boundaries, costs)
+        summary = _summary(values, turnover, cost_fraction, _worker["benchmark_returns"],
+                           _worker["annual_factor"], _worker["risk_free_rate"])
+        for j, index in enumerate(indices):
+            rows[index] = {key: float(v[j]) for key, v in summary.items()}
+    return rows
+
+
+@timing.timed("backtest")
+def backtest_grid(returns, grid=None, benchmark=None, processes=None, chunk_size=32,
+                  annual_factor=ANNUAL_FACTOR, risk_free_rate=RISK_FREE_RATE):
+    # Un backtest par combinaison de `grid` (voir parameter_grid) ; une ligne de résultats par combinaison
+    grid = parameter_grid() if grid is None else list(grid)
+    returns, benchmark_returns = _prepare(returns, benchmark)
+    initargs = (_log_growth(returns.to_numpy()), returns.index, benchmark_returns, annual_factor, risk_free_rate)
+
+    tasks = list(enumerate(grid))
+    chunks = [tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+    processes = processes or os.cpu_count() or 1
+    rows = {}
+    if processes == 1 or len(chunks) == 1:
+        _init_worker(*initargs)
+        for chunk in chunks:
+            rows.update(_run_chunk(chunk))
+    else:
+        with parallel.process_pool(min(processes, len(chunks)), _init_worker, initargs) as pool:
+            for chunk_rows in pool.map(_run_chunk, chunks):
+                rows.update(chunk_rows)
+
+    parameters = pd.DataFrame([{k: v for k, v in params.items() if k != "weights"} for params in grid])
+    parameters["weights"] = [None if p["weights"] is None else tuple(np.round(p["weights"], 4)) for p in grid]
+    return pd.concat([parameters, pd.DataFrame([rows[i] for i in range(len(grid))])], axis=1)
+
+
+def backtest_wallet(wallet_stats, benchmark, **kwargs):
+    # Backtest à partir des statistiques de dfv.get_wallet_statistics (équipondéré par défaut)
+    return backtest(wallet_stats["daily_returns"], benchmark=benchmark, **kwargs)
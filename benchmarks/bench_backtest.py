@@ -0,0 +1,62 @@
+# Débit du backtest (backtest.backtest_grid) sur un panel synthétique, en portefeuilles-années par
+# seconde, avec un seul processus puis avec tous les cœurs, comparé à une boucle jour par jour.
+#
+# Usage : python benchmarks/bench_backtest.py [--assets 50] [--years 20] [--weights 20] [--processes 1 4]
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import backtest  # noqa: E402
+
+
+def loop_backtest(returns, weights, cost, periods):
+    # Référence : dérive et rééquilibrage mensuel simulés jour par jour
+    holdings = weights.copy()
+    for t in range(len(returns)):
+        holdings = holdings * (1 + returns[t])
+        value = holdings.sum()
+        if t < len(returns) - 1 and periods[t] != periods[t + 1]:
+            value *= 1 - cost * np.abs(holdings / value - weights).sum()
+            holdings = weights * value
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--assets", type=int, default=50)
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--weights", type=int, default=20)
+    parser.add_argument("--processes", type=int, nargs="+", default=sorted({1, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("2000-01-03", periods=252 * args.years)
+    returns = pd.DataFrame(rng.normal(0.0003, 0.012, (len(dates), args.assets)), index=dates)
+    benchmark = pd.Series(rng.normal(0.0003, 0.01, len(dates)), index=dates)
+    weights = rng.dirichlet(np.ones(args.assets), size=args.weights)
+    grid = backtest.parameter_grid(costs=(0.0, 0.0005, 0.001, 0.0025), thresholds=(0.01, 0.02, 0.05, 0.1, 0.2),
+                                   weights=weights)
+    print(f"{len(grid)} combinaisons, {args.assets} actifs, {args.years} ans")
+
+    for processes in args.processes:
+        begin = time.perf_counter()
+        backtest.backtest_grid(returns, grid, benchmark=benchmark, processes=processes)
+        elapsed = time.perf_counter() - begin
+        print(f"{processes} processus : {elapsed:.2f} s, {len(grid) * args.years / elapsed:,.0f} portefeuilles-années/s")
+
+    periods = dates.to_period("M").asi8
+    values = returns.to_numpy()
+    begin = time.perf_counter()
+    for w in weights[:5]:
+        loop_backtest(values, w, 0.001, periods)
+    elapsed = time.perf_counter() - begin
+    print(f"boucle jour par jour (mensuel) : {5 * args.years / elapsed:,.0f} portefeuilles-années/s")
+
+
+if __name__ == "__main__":
+    main()
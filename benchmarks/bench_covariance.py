@@ -0,0 +1,57 @@
+# Estimateurs de covariance (covariance.py) sur des univers synthétiques à historique court :
+# temps d'estimation, mémoire de la forme compacte face à la matrice N x N, variance de lots de
+# portefeuilles sans matrice dense, et conditionnement de la matrice obtenue.
+#
+# Usage : python benchmarks/bench_covariance.py [--assets 500 2000 5000] [--days 252] [--portfolios 1000]
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import covariance  # noqa: E402
+
+
+def synthetic_returns(n_days, n_assets, n_factors=5, seed=0):
+    # Rendements journaliers tirés d'un modèle à quelques facteurs plus un bruit spécifique
+    rng = np.random.default_rng(seed)
+    factors = rng.normal(0.0, 0.01, (n_days, n_factors))
+    exposures = rng.normal(0.5, 0.5, (n_assets, n_factors))
+    return factors @ exposures.T + rng.normal(0.0, 0.012, (n_days, n_assets))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--assets", type=int, nargs="+", default=[500, 2000, 5000])
+    parser.add_argument("--days", type=int, default=252)
+    parser.add_argument("--portfolios", type=int, default=1000)
+    parser.add_argument("--max-dense", type=int, default=5000,
+                        help="au-delà, la matrice dense n'est pas construite (conditionnement non mesuré)")
+    args = parser.parse_args()
+
+    for n_assets in args.assets:
+        returns = synthetic_returns(args.days, n_assets)
+        weights = np.random.default_rng(1).dirichlet(np.ones(n_assets), args.portfolios)
+        print(f"{n_assets} titres, {args.days} séances, matrice dense : {n_assets ** 2 * 8 / 2 ** 20:.1f} Mio")
+        for method in covariance.ESTIMATORS:
+            begin = time.perf_counter()
+            model = covariance.estimate(returns, method)
+            fit = time.perf_counter() - begin
+
+            begin = time.perf_counter()
+            model.variance(weights)
+            variance = time.perf_counter() - begin
+
+            line = (f"  {method:<12} estimation {fit:7.3f} s, forme compacte {model.nbytes / 2 ** 20:7.2f} Mio "
+                    f"(rang {model.rank}), variance de {args.portfolios} portefeuilles {variance:.4f} s")
+            if n_assets <= args.max_dense:
+                eigenvalues = np.linalg.eigvalsh(model.to_dense())
+                condition = eigenvalues[-1] / eigenvalues[0] if eigenvalues[0] > 0 else np.inf
+                line += f", conditionnement {condition:.3g}"
+            print(line, flush=True)
+
+
+if __name__ == "__main__":
+    main()
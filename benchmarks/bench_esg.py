@@ -0,0 +1,63 @@
+# Température implicite et note MSCI pondérées sur un univers synthétique de plusieurs milliers
+# d'émetteurs, pour un lot de portefeuilles (esg.ESGStore).
+#
+# Usage : python benchmarks/bench_esg.py [--issuers 5000] [--portfolios 1000]
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import esg  # noqa: E402
+
+
+def synthetic_universe(n_issuers, seed=0):
+    rng = np.random.default_rng(seed)
+    flags = np.array(esg.CONTROVERSY_FLAGS)
+    return pd.DataFrame({
+        "ticker": [f"ISS{i:05d}" for i in range(n_issuers)],
+        "name": "",
+        "asset_class": rng.choice(["equity", "fund", "bond", "scpi"], n_issuers, p=[0.85, 0.1, 0.03, 0.02]),
+        "msci_rating": rng.choice(esg.MSCI_RATINGS, n_issuers),
+        "controversy_e": rng.choice(flags, n_issuers),
+        "controversy_s": rng.choice(flags, n_issuers),
+        "controversy_g": rng.choice(flags, n_issuers),
+        "tobacco": rng.random(n_issuers) < 0.03,
+        "alcohol": rng.random(n_issuers) < 0.05,
+        "controversial_other": rng.random(n_issuers) < 0.1,
+        "decarbonization_year": rng.choice([0, 2030, 2040, 2050], n_issuers),
+        "emissions_coverage": rng.uniform(50, 100, n_issuers),
+        "implied_temperature": np.where(rng.random(n_issuers) < 0.9, rng.uniform(1.2, 3.5, n_issuers), np.nan),
+        "sfdr_article": rng.choice([0, 6, 8, 9], n_issuers),
+        "greenfin": rng.random(n_issuers) < 0.2,
+        "isr": rng.random(n_issuers) < 0.3,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--issuers", type=int, default=5000)
+    parser.add_argument("--portfolios", type=int, default=1000)
+    args = parser.parse_args()
+
+    begin = time.perf_counter()
+    store = esg.ESGStore.from_frame(synthetic_universe(args.issuers))
+    print(f"chargement de {args.issuers} émetteurs : {time.perf_counter() - begin:.3f} s "
+          f"({store.records.nbytes / 1024:.0f} Kio de données numériques)")
+
+    weights = np.random.default_rng(1).dirichlet(np.ones(args.issuers), size=args.portfolios)
+    for label, function in [("température pondérée", store.weighted_temperature), ("note MSCI pondérée", store.weighted_rating)]:
+        begin = time.perf_counter()
+        function(weights[0])
+        single = time.perf_counter() - begin
+        begin = time.perf_counter()
+        function(weights)
+        batch = time.perf_counter() - begin
+        print(f"{label:<22}: 1 portefeuille {single * 1000:.2f} ms, {args.portfolios} portefeuilles {batch * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# Téléchargement séquentiel vs concurrent (fetcher.ConcurrentProvider) contre un fournisseur local
+# qui simule la latence réseau, la limitation de débit et des tickers introuvables.
+#
+# Usage : python benchmarks/bench_fetcher.py [--tickers 200] [--latency 0.05] [--failure-rate 0.1]
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fetcher import ConcurrentProvider  # noqa: E402
+from price_store import FrameProvider  # noqa: E402
+
+
+class FlakyProvider(FrameProvider):
+    # Fournisseur local : latence fixe par appel, erreurs aléatoires de « rate limit »,
+    # et tickers définitivement absents
+    def __init__(self, prices, latency, failure_rate, unknown, seed=0):
+        super().__init__(prices)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.unknown = set(unknown)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def fetch(self, tickers, start, end):
+        time.sleep(self.latency)
+        with self._lock:
+            failed = self._random.random() < self.failure_rate
+        if failed:
+            raise RuntimeError("429 Too Many Requests")
+        return super().fetch([t for t in tickers if t not in self.unknown], start, end)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tickers", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    names = [f"T{i:04d}" for i in range(args.tickers)]
+    index = pd.bdate_range("2019-01-01", "2024-12-31")
+    prices = pd.DataFrame(np.random.default_rng(0).lognormal(0, 0.01, (len(index), len(names))).cumprod(axis=0),
+                          index=index, columns=names)
+    unknown = names[:3]
+
+    def provider():
+        return FlakyProvider(prices, args.latency, args.failure_rate, unknown)
+
+    for label, workers, batch_size in [("séquentiel, 1 ticker par appel", 1, 1),
+                                       ("concurrent, lots de 10", args.workers, 10)]:
+        fetcher = ConcurrentProvider(sources=[provider], batch_size=batch_size, max_workers=workers,
+                                     backoff=args.latency, max_backoff=4 * args.latency)
+        begin = time.perf_counter()
+        result = fetcher.fetch_report(names, "2019-01-01", "2025-01-01")
+        elapsed = time.perf_counter() - begin
+        fetcher.close()
+        print(f"{label:<32}: {elapsed:.2f} s, {result.prices.shape[1]} tickers reçus, manquants : {result.missing}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# Mesure du coût d'import de data_finance_verte : l'import ne doit faire aucun téléchargement
+# ni aucun calcul, seulement charger pandas/numpy.
+#
+# Usage : python benchmarks/bench_import.py [--repeat 5] [--max-overhead 0.15]
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_import(statement, repeat):
+    timings = []
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], cwd=ROOT, check=True)
+        timings.append(time.perf_counter() - begin)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-overhead", type=float, default=0.15,
+                        help="surcoût maximal toléré (secondes) par rapport à l'import de pandas/numpy")
+    args = parser.parse_args()
+
+    baseline = time_import("import numpy, pandas", args.repeat)
+    module = time_import(
+        "import sys, data_finance_verte; assert 'yfinance' not in sys.modules", args.repeat
+    )
+    overhead = module - baseline
+
+    print(f"import numpy, pandas       : {baseline:.3f} s")
+    print(f"import data_finance_verte  : {module:.3f} s")
+    print(f"surcoût                    : {overhead:.3f} s (max {args.max_overhead:.3f} s)")
+
+    if overhead > args.max_overhead:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
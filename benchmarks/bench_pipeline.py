@@ -0,0 +1,214 @@
+# Temps passé dans chaque étape du pipeline (timing.StageTimer) et pic mémoire, entièrement hors
+# ligne, sur des panels de cours synthétiques de 10 à 5 000 tickers et de 1 à 30 ans.
+#
+# Pour chaque taille, deux passes, chacune dans un processus neuf (comme une relance du serveur) :
+# - "cold" : cache des cours vide (fournisseur en mémoire, écriture des fichiers Parquet) ;
+# - "warm" : cache des cours rempli par la passe précédente, sans fournisseur.
+# Chaque passe exécute get_stock_statistics et get_wallet_statistics, puis le chemin de données de
+# show_performances (S&P 500, backtest, frontière efficiente, risque glissant, Monte Carlo, graphiques).
+# Le pic mémoire est le pic de mémoire résidente du processus (tracemalloc ralentirait fortement
+# le rendu des graphiques et fausserait les durées).
+#
+# Les résultats sont écrits en JSON (par défaut benchmarks/results/bench_pipeline.json, ignoré par
+# git ; en CSV en option) ; --baseline compare à un fichier JSON
+# précédent et termine en erreur si une étape a ralenti au-delà de la tolérance.
+#
+# Usage : python benchmarks/bench_pipeline.py [--tickers 10 100 1000] [--years 1 10] [--full]
+#                                             [--output results.json] [--csv results.csv]
+#                                             [--baseline previous.json] [--tolerance 0.25]
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import backtest  # noqa: E402
+import charts  # noqa: E402
+import data_finance_verte as dfv  # noqa: E402
+import monte_carlo  # noqa: E402
+import optimizer  # noqa: E402
+import rolling  # noqa: E402
+import stats_cache  # noqa: E402
+import timing  # noqa: E402
+from price_store import FrameProvider, PriceStore  # noqa: E402
+
+BENCHMARK_TICKER = "^SPX"
+# Écart minimal (secondes) en dessous duquel un ralentissement est considéré comme du bruit
+NOISE_FLOOR = 0.05
+# Répertoire des résultats par défaut (ignoré par git)
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def panel_layout(n_tickers, years):
+    dates = pd.bdate_range(end="2024-12-31", periods=252 * years, name="Date")
+    return dates, [f"T{i:04d}" for i in range(n_tickers)] + [BENCHMARK_TICKER]
+
+
+def synthetic_panel(n_tickers, years, seed=0):
+    # Cours journaliers (jours ouvrés) avec quelques introductions en bourse tardives et des trous isolés
+    rng = np.random.default_rng(seed)
+    dates, columns = panel_layout(n_tickers, years)
+    returns = rng.normal(0.0003, 0.015, (len(dates), len(columns)))
+    prices = 100 * np.exp(np.cumsum(returns, axis=0))
+    listing = rng.integers(0, len(dates) // 20 + 1, len(columns))
+    prices[np.arange(len(dates))[:, None] < listing[None, :]] = np.nan
+    prices[rng.random(prices.shape) < 0.001] = np.nan
+    prices[:, -1] = 4000 * np.exp(np.cumsum(rng.normal(0.0003, 0.01, len(dates))))
+    return pd.DataFrame(prices, index=dates, columns=columns)
+
+
+def peak_rss_mb():
+    # Pic de mémoire résidente du processus (Ko sous Linux, octets sous macOS) ; None sous Windows
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def performances_data_path(tickers, start, end, args):
+    # Mêmes appels que la page Performances, hors Streamlit (champs matérialisés comme par StatsCache)
+    stock_stats = stats_cache._materialize(dfv.get_stock_statistics(tickers, start, end))
+    wallet_stats = stats_cache._materialize(dfv.get_wallet_statistics(tickers, start, end))
+    spx_data = dfv.get_stock_statistics(BENCHMARK_TICKER, start, end)["returns"]
+
+    result = backtest.backtest_wallet(wallet_stats, spx_data, schedule="monthly", cost=0.001)
+    if len(tickers) <= args.max_optimizer_assets:
+        optimal = optimizer.optimize_wallet(wallet_stats, n_points=args.frontier_points)
+    else:
+        optimal = None
+    risk = rolling.rolling_metrics(wallet_stats["daily_returns"], spx_data, window=63)
+    simulation = monte_carlo.simulate_wallet(wallet_stats, n_paths=args.mc_paths, horizon_years=10, processes=1)
+
+    if len(tickers) <= args.max_chart_assets:
+        charts.render_png(charts.mean_returns_bar, wallet_stats["mean_annual_returns"], figsize=(8, 4))
+        charts.render_png(charts.correlation_heatmap, wallet_stats["correlation_matrix"], figsize=(8, 6))
+    charts.render_png(charts.performance_chart, result["value"], result["benchmark_value"])
+    if optimal is not None:
+        charts.render_png(charts.frontier_chart, optimal["frontier"],
+                          (optimal["min_variance"]["annual_volatility"], optimal["min_variance"]["annual_return"]),
+                          (optimal["max_sharpe"]["annual_volatility"], optimal["max_sharpe"]["annual_return"]),
+                          (wallet_stats["portfolio_annual_volatility"], wallet_stats["portfolio_annual_return"]))
+    charts.render_png(charts.rolling_chart, risk[["volatility", "sharpe_ratio", "beta"]], window=63, figsize=(10, 8))
+    charts.render_png(charts.drawdown_chart, risk["drawdown"], figsize=(10, 3))
+    charts.render_png(charts.monte_carlo_fan, simulation["percentiles"], simulation["n_paths"])
+    return stock_stats, wallet_stats
+
+
+def run_worker(n_tickers, years, run, directory, args):
+    # Une passe, exécutée dans son propre processus ; les enregistrements sont écrits en JSON sur stdout
+    dates, columns = panel_layout(n_tickers, years)
+    provider = FrameProvider(synthetic_panel(n_tickers, years) if run == "cold" else pd.DataFrame())
+    dfv.set_price_store(PriceStore(directory, provider, offline=run != "cold"))
+    tickers = columns[:-1]
+    start, end = str(dates[0].date()), str((dates[-1] + pd.Timedelta(days=1)).date())
+
+    rss_before = peak_rss_mb()
+    begin = time.perf_counter()
+    with timing.StageTimer() as timer:
+        performances_data_path(tickers, start, end, args)
+    total = time.perf_counter() - begin
+
+    base = {"tickers": n_tickers, "years": years, "run": run}
+    records = [{**base, "stage": stage, "seconds": float(row["seconds"]), "calls": int(row["calls"])}
+               for stage, row in timer.report().iterrows()]
+    records.append({**base, "stage": "total", "seconds": total, "calls": 1,
+                    "rss_before_mb": rss_before, "peak_rss_mb": peak_rss_mb()})
+    json.dump(records, sys.stdout)
+
+
+def run_case(n_tickers, years, args):
+    records = []
+    with tempfile.TemporaryDirectory() as directory:
+        for run in ("cold", "warm"):
+            command = [sys.executable, os.path.abspath(__file__), "--worker", str(n_tickers), str(years), run, directory,
+                       "--mc-paths", str(args.mc_paths), "--frontier-points", str(args.frontier_points),
+                       "--max-optimizer-assets", str(args.max_optimizer_assets),
+                       "--max-chart-assets", str(args.max_chart_assets)]
+            output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+            run_records = json.loads(output)
+            records.extend(run_records)
+
+            stages = [r for r in run_records if r["stage"] != "total"]
+            total = run_records[-1]
+            memory = f"pic mémoire {total['peak_rss_mb']:8.1f} Mio" if total["peak_rss_mb"] is not None else ""
+            print(f"{n_tickers:>5} tickers, {years:>2} ans, {run} : {total['seconds']:7.2f} s, {memory}  "
+                  + "  ".join(f"{r['stage']}={r['seconds']:.2f}" for r in stages), flush=True)
+    return records
+
+
+def compare(records, baseline_path, tolerance):
+    # Étapes plus lentes que la référence au-delà de la tolérance relative (et du bruit absolu)
+    with open(baseline_path) as f:
+        baseline = {(r["tickers"], r["years"], r["run"], r["stage"]): r["seconds"] for r in json.load(f)["results"]}
+    regressions = []
+    for r in records:
+        previous = baseline.get((r["tickers"], r["years"], r["run"], r["stage"]))
+        if previous is not None and r["seconds"] > previous * (1 + tolerance) and r["seconds"] - previous > NOISE_FLOOR:
+            regressions.append({**r, "baseline_seconds": previous})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tickers", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--full", action="store_true", help="grille complète : 10 à 5 000 tickers, 1 à 30 ans")
+    parser.add_argument("--mc-paths", type=int, default=20_000)
+    parser.add_argument("--frontier-points", type=int, default=20)
+    parser.add_argument("--max-optimizer-assets", type=int, default=500)
+    parser.add_argument("--max-chart-assets", type=int, default=200,
+                        help="au-delà, l'histogramme et la heatmap ne sont pas dessinés (illisibles)")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "bench_pipeline.json"))
+    parser.add_argument("--csv")
+    parser.add_argument("--baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--worker", nargs=4, metavar=("TICKERS", "YEARS", "RUN", "DIRECTORY"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        n_tickers, years, run, directory = args.worker
+        run_worker(int(n_tickers), int(years), run, directory, args)
+        return
+    if args.full:
+        args.tickers, args.years = [10, 100, 1000, 5000], [1, 10, 30]
+
+    records = []
+    for n_tickers in args.tickers:
+        for years in args.years:
+            records.extend(run_case(n_tickers, years, args))
+
+    metadata = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({"metadata": metadata, "results": records}, f, indent=1)
+    print(f"résultats : {args.output}")
+    if args.csv:
+        pd.DataFrame(records).to_csv(args.csv, index=False)
+
+    if args.baseline:
+        regressions = compare(records, args.baseline, args.tolerance)
+        for r in regressions:
+            print(f"RÉGRESSION {r['tickers']} tickers, {r['years']} ans, {r['run']}, {r['stage']} : "
+                  f"{r['baseline_seconds']:.3f} s -> {r['seconds']:.3f} s")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
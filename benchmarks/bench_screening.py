@@ -0,0 +1,52 @@
+# Sélection ESG (screening.ScreeningEngine) sur un univers synthétique : évaluation complète,
+# rapport des motifs d'exclusion et réévaluation incrémentale d'une petite partie des émetteurs.
+#
+# Usage : python benchmarks/bench_screening.py [--issuers 50000] [--changed 100]
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import esg  # noqa: E402
+import screening  # noqa: E402
+from bench_esg import synthetic_universe  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--issuers", type=int, default=50000)
+    parser.add_argument("--changed", type=int, default=100)
+    args = parser.parse_args()
+
+    universe = synthetic_universe(args.issuers)
+    store = esg.ESGStore.from_frame(universe)
+
+    begin = time.perf_counter()
+    engine = screening.ScreeningEngine(store)
+    print(f"évaluation de {args.issuers} émetteurs : {time.perf_counter() - begin:.4f} s "
+          f"({int(engine.selected_mask.sum())} retenus)")
+
+    begin = time.perf_counter()
+    report = engine.report()
+    print(f"rapport des motifs d'exclusion : {time.perf_counter() - begin:.4f} s "
+          f"({int((~report['selected']).sum())} exclus)")
+
+    rng = np.random.default_rng(1)
+    changes = universe.iloc[rng.choice(args.issuers, args.changed, replace=False)].copy()
+    changes["msci_rating"] = "AAA"
+    begin = time.perf_counter()
+    engine.update(changes)
+    print(f"réévaluation incrémentale de {args.changed} émetteurs : {time.perf_counter() - begin:.4f} s")
+
+    # Sans mise à jour incrémentale, tout l'univers est relu puis réévalué
+    universe.loc[changes.index] = changes
+    begin = time.perf_counter()
+    screening.ScreeningEngine(esg.ESGStore.from_frame(universe))
+    print(f"rechargement et réévaluation complets pour comparaison : {time.perf_counter() - begin:.4f} s")
+
+
+if __name__ == "__main__":
+    main()
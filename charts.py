@@ -0,0 +1,161 @@
+# Rendu des graphiques de la page Performances.
+#
+# Les figures sont créées avec matplotlib.figure.Figure, hors de pyplot : aucune figure n'est
+# enregistrée dans l'état global de pyplot, elles sont libérées dès que l'image PNG est produite
+# et peuvent être dessinées depuis plusieurs threads. Les images sont mises en cache selon une
+# empreinte des données et des paramètres : une visite sur des données inchangées ne redessine rien.
+#
+# ChartRenderer dessine sur un pool de threads ; la page réserve un emplacement par graphique,
+# poursuit ses calculs et n'affiche les images qu'une fois prêtes.
+import hashlib
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+import timing
+from stats_cache import StatsCache
+
+
+def fingerprint(*objects):
+    # Empreinte des données d'un graphique (DataFrame, Series, tableaux, scalaires, dictionnaires)
+    digest = hashlib.blake2b(digest_size=16)
+    for obj in objects:
+        if isinstance(obj, (pd.DataFrame, pd.Series)):
+            digest.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+            names = obj.columns if isinstance(obj, pd.DataFrame) else [obj.name]
+            digest.update(repr(list(names)).encode())
+        elif isinstance(obj, np.ndarray):
+            digest.update(np.ascontiguousarray(obj).tobytes())
+            digest.update(repr((obj.dtype.str, obj.shape)).encode())
+        elif isinstance(obj, dict):
+            digest.update(fingerprint(*sorted(obj.items(), key=lambda item: str(item[0]))).encode())
+        elif isinstance(obj, (list, tuple)):
+            digest.update(fingerprint(*obj).encode())
+        else:
+            digest.update(repr(obj).encode())
+        digest.update(b"|")
+    return digest.hexdigest()
+
+
+@timing.timed("plotting")
+def render_png(draw, *data, figsize=(10, 5), dpi=100, **params):
+    # Dessine `draw(fig, *data, **params)` sur une figure hors pyplot et renvoie l'image PNG
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    draw(fig, *data, **params)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    fig.clear()
+    return buffer.getvalue()
+
+
+def downsample(frame, max_points=500, how="last"):
+    # Réduction d'une série journalière à au plus `max_points` points pour les graphiques interactifs.
+    # `how` : "last" (valeur de fin de chaque paquet de dates), "min" ou "max" (extrêmes préservés,
+    # pour les drawdowns par exemple).
+    n = len(frame)
+    if n <= max_points:
+        return frame
+    bucket = -(-n // max_points)
+    groups = np.arange(n) // bucket
+    reduced = getattr(frame.groupby(groups), how)()
+    reduced.index = frame.index[np.minimum((np.arange(len(reduced)) + 1) * bucket, n) - 1]
+    return reduced
+
+
+class ChartRenderer:
+    def __init__(self, maxsize=64, max_workers=4):
+        self.cache = StatsCache(maxsize=maxsize)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="charts")
+
+    def submit(self, name, draw, *data, figsize=(10, 5), **params):
+        # Rendu en arrière-plan ; renvoie un Future dont le résultat est l'image PNG
+        key = ("chart", name, fingerprint(figsize, params, *data))
+        return self._executor.submit(
+            self.cache.get_or_compute, key, lambda: render_png(draw, *data, figsize=figsize, **params))
+
+    def render(self, name, draw, *data, **kwargs):
+        return self.submit(name, draw, *data, **kwargs).result()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+# ------------------------------
+# Graphiques de la page Performances
+# ------------------------------
+def mean_returns_bar(fig, mean_returns):
+    ax = fig.subplots()
+    ax.bar(mean_returns.index, mean_returns.values)
+    ax.set_title("Rendements annuels moyens par Actif")
+    ax.set_ylabel("Rendement annuel (%)")
+    ax.set_xlabel("Actif")
+    ax.tick_params(axis="x", labelrotation=45)
+
+
+def correlation_heatmap(fig, corr_matrix):
+    ax = fig.subplots()
+    cax = ax.imshow(corr_matrix, interpolation="nearest", cmap="coolwarm")
+    fig.colorbar(cax)
+    ax.set_xticks(np.arange(len(corr_matrix.columns)))
+    ax.set_yticks(np.arange(len(corr_matrix.index)))
+    ax.set_xticklabels(corr_matrix.columns, rotation=90)
+    ax.set_yticklabels(corr_matrix.index)
+    ax.set_title("Matrice de Corrélation", pad=20)
+
+
+def performance_chart(fig, value, benchmark_value):
+    ax = fig.subplots()
+    ax.plot(value.index, value.values, label="Portefeuille", color="blue")
+    ax.plot(benchmark_value.index, benchmark_value.values, label="S&P 500", color="red")
+    ax.set_title("Performance du Portefeuille Équipondéré vs S&P 500")
+    ax.set_ylabel("Valeur du Portefeuille")
+    ax.set_xlabel("Date")
+    ax.legend()
+
+
+def frontier_chart(fig, frontier, min_variance, max_sharpe, portfolio):
+    # `min_variance`, `max_sharpe`, `portfolio` : couples (volatilité, rendement) annuels
+    ax = fig.subplots()
+    ax.plot(frontier["annual_volatility"], frontier["annual_return"], label="Frontière efficiente", color="green")
+    ax.scatter(*min_variance, label="Variance minimale", color="blue", zorder=3)
+    ax.scatter(*max_sharpe, label="Sharpe maximal", color="orange", zorder=3)
+    ax.scatter(*portfolio, label="Portefeuille équipondéré", color="red", zorder=3)
+    ax.set_title("Frontière efficiente du portefeuille")
+    ax.set_xlabel("Volatilité annuelle")
+    ax.set_ylabel("Rendement annuel")
+    ax.legend()
+
+
+def rolling_chart(fig, risk, window):
+    ax1, ax2, ax3 = fig.subplots(3, 1, sharex=True)
+    ax1.plot(risk.index, risk["volatility"], color="blue")
+    ax1.set_ylabel("Volatilité")
+    ax2.plot(risk.index, risk["sharpe_ratio"], color="green")
+    ax2.set_ylabel("Sharpe")
+    ax3.plot(risk.index, risk["beta"], color="red")
+    ax3.set_ylabel("Bêta vs S&P 500")
+    ax3.set_xlabel("Date")
+    ax1.set_title(f"Indicateurs glissants sur {window} jours")
+
+
+def drawdown_chart(fig, drawdown):
+    ax = fig.subplots()
+    ax.fill_between(drawdown.index, drawdown.values, 0, color="red", alpha=0.4)
+    ax.set_title("Drawdown du portefeuille")
+    ax.set_ylabel("Drawdown")
+
+
+def monte_carlo_fan(fig, fan, n_paths):
+    ax = fig.subplots()
+    ax.fill_between(fan.index, fan[5], fan[95], color="green", alpha=0.2, label="5 % - 95 %")
+    ax.fill_between(fan.index, fan[25], fan[75], color="green", alpha=0.4, label="25 % - 75 %")
+    ax.plot(fan.index, fan[50], color="green", label="Médiane")
+    ax.set_title(f"Valeur simulée du portefeuille ({n_paths:,} trajectoires)".replace(",", " "))
+    ax.set_xlabel("Années")
+    ax.set_ylabel("Valeur du Portefeuille")
+    ax.legend()
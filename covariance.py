@@ -0,0 +1,155 @@
+# Estimateurs de la covariance des rendements pour les grands univers (milliers de titres ESG,
+# historiques parfois courts) :
+# - "sample" : covariance empirique ;
+# - "ledoit_wolf" : covariance empirique rétrécie vers une identité mise à l'échelle
+#   (Ledoit et Wolf, 2004), bien conditionnée même quand il y a plus de titres que de dates ;
+# - "ewma" : moyenne mobile exponentielle (RiskMetrics, décroissance 0,94 par séance) ;
+# - "factor" : modèle à k facteurs statistiques (composantes principales) plus un risque
+#   spécifique propre à chaque titre.
+#
+# Tous les estimateurs renvoient la même forme compacte Σ = B B' + diag(d), avec B de taille N x k :
+# k = nombre de dates pour "sample" et "ledoit_wolf", nombre de séances de poids non négligeable
+# pour "ewma", nombre de facteurs pour "factor". La mémoire est en O(N k), jamais plus que le
+# panel des rendements lui-même, et la variance d'un portefeuille ||B' w||² + Σ d w² se calcule
+# sans construire la matrice N x N ; to_dense() ne sert qu'aux calculs qui en ont besoin
+# (optimiseur, Monte Carlo paramétrique, heatmap).
+import numpy as np
+import pandas as pd
+
+ESTIMATORS = ("sample", "ledoit_wolf", "ewma", "factor")
+# Poids relatif en dessous duquel une séance ancienne est ignorée par l'estimateur EWMA
+_EWMA_CUTOFF = 1e-8
+# Plancher du risque spécifique du modèle à facteurs, en fraction de la variance de chaque titre
+_SPECIFIC_FLOOR = 1e-4
+
+
+class CovarianceModel:
+    # Covariance sous forme facteurs + diagonale : Σ = loadings @ loadings.T + diag(specific)
+    def __init__(self, loadings, specific, tickers=None, method="sample", shrinkage=None):
+        self.loadings = np.ascontiguousarray(loadings, dtype=np.float64)
+        self.specific = np.ascontiguousarray(specific, dtype=np.float64)
+        self.tickers = list(tickers) if tickers is not None else None
+        self.method = method
+        self.shrinkage = shrinkage  # intensité de rétrécissement (Ledoit-Wolf uniquement)
+        self.loadings.flags.writeable = False
+        self.specific.flags.writeable = False
+
+    @property
+    def n_assets(self):
+        return self.loadings.shape[0]
+
+    @property
+    def rank(self):
+        return self.loadings.shape[1]
+
+    @property
+    def nbytes(self):
+        return self.loadings.nbytes + self.specific.nbytes
+
+    def scaled(self, factor):
+        # Même modèle multiplié par `factor` (annualisation, changement de pas de temps)
+        return CovarianceModel(self.loadings * np.sqrt(factor), self.specific * factor, self.tickers, self.method,
+                               self.shrinkage)
+
+    def variance(self, weights):
+        # w' Σ w pour un vecteur de poids (scalaire) ou pour chaque ligne d'une matrice P x N
+        W = np.asarray(weights, dtype=np.float64)
+        exposures = W @ self.loadings
+        variance = np.einsum("...k,...k->...", exposures, exposures) + (W * W) @ self.specific
+        return float(variance) if W.ndim == 1 else variance
+
+    def volatility(self, weights):
+        return np.sqrt(self.variance(weights))
+
+    def dot(self, weights):
+        # Σ w sans construire Σ (contributions au risque, gradients)
+        W = np.asarray(weights, dtype=np.float64)
+        return (W @ self.loadings) @ self.loadings.T + W * self.specific
+
+    def diagonal(self):
+        return np.einsum("ik,ik->i", self.loadings, self.loadings) + self.specific
+
+    def to_dense(self):
+        cov = self.loadings @ self.loadings.T
+        cov[np.diag_indices_from(cov)] += self.specific
+        return cov
+
+    def to_frame(self):
+        return pd.DataFrame(self.to_dense(), index=self.tickers, columns=self.tickers)
+
+    def __repr__(self):
+        return f"CovarianceModel(method={self.method!r}, n_assets={self.n_assets}, rank={self.rank})"
+
+
+def _centered(returns):
+    X = np.asarray(returns, dtype=np.float64)
+    return X - X.mean(axis=0)
+
+
+def sample_covariance(returns, tickers=None):
+    X = _centered(returns)
+    return CovarianceModel(X.T / np.sqrt(len(X) - 1), np.zeros(X.shape[1]), tickers, "sample")
+
+
+def ledoit_wolf(returns, tickers=None):
+    # Intensité de rétrécissement de Ledoit et Wolf vers μ I, μ = variance moyenne.
+    # Les normes de Frobenius sont calculées sur la plus petite des deux matrices de Gram
+    # (T x T ou N x N) : aucune matrice N x N quand il y a plus de titres que de dates.
+    X = _centered(returns)
+    T, N = X.shape
+    X2 = X * X
+    variances = X2.sum(axis=0) / T
+    mu = variances.sum() / N
+    gram = X @ X.T if T <= N else X.T @ X
+    delta_ = np.square(gram).sum() / T ** 2
+    beta_ = np.square(X2.sum(axis=1)).sum()
+    beta = (beta_ / T - delta_) / (N * T)
+    delta = (delta_ - 2 * mu * variances.sum() + N * mu ** 2) / N
+    beta = min(beta, delta)
+    shrinkage = 0.0 if beta == 0 else beta / delta
+
+    return CovarianceModel(X.T * np.sqrt((1 - shrinkage) / T), np.full(N, shrinkage * mu), tickers, "ledoit_wolf",
+                           shrinkage)
+
+
+def ewma_covariance(returns, tickers=None, decay=0.94):
+    # Poids (1 - λ) λ^âge normalisés ; les séances dont le poids est négligeable sont écartées
+    X = np.asarray(returns, dtype=np.float64)
+    age = np.arange(len(X))[::-1]
+    weights = decay ** age
+    keep = weights >= _EWMA_CUTOFF
+    X, weights = X[keep], weights[keep] / weights[keep].sum()
+    mean = weights @ X
+    return CovarianceModel((X - mean).T * np.sqrt(weights), np.zeros(X.shape[1]), tickers, "ewma")
+
+
+def factor_model(returns, tickers=None, n_factors=5, seed=0):
+    # k premières composantes principales (SVD tronquée randomisée, O(T N k)) ; le risque spécifique
+    # est la variance de chaque titre non expliquée par les facteurs
+    X = _centered(returns) / np.sqrt(len(returns) - 1)
+    k = max(1, min(n_factors, *X.shape))
+    rng = np.random.default_rng(seed)
+    Q, _ = np.linalg.qr(X.T @ rng.standard_normal((X.shape[0], min(k + 10, min(X.shape)))))
+    for _ in range(4):
+        Q, _ = np.linalg.qr(X.T @ (X @ Q))
+    _, s, Vt = np.linalg.svd(X @ Q, full_matrices=False)
+    loadings = Q @ Vt[:k].T * s[:k]
+
+    variances = np.einsum("ti,ti->i", X, X)
+    specific = np.maximum(variances - np.einsum("ik,ik->i", loadings, loadings), _SPECIFIC_FLOOR * variances)
+    return CovarianceModel(loadings, specific, tickers, "factor")
+
+
+def estimate(returns, method="sample", tickers=None, **params):
+    # Covariance journalière des rendements (DataFrame ou tableau T x N) selon l'estimateur choisi
+    if tickers is None and isinstance(returns, pd.DataFrame):
+        tickers = returns.columns
+    if method == "sample":
+        return sample_covariance(returns, tickers)
+    if method == "ledoit_wolf":
+        return ledoit_wolf(returns, tickers)
+    if method == "ewma":
+        return ewma_covariance(returns, tickers, **params)
+    if method == "factor":
+        return factor_model(returns, tickers, **params)
+    raise ValueError(f"Estimateur inconnu : {method!r} (attendu l'un de {', '.join(ESTIMATORS)})")
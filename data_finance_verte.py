@@ -1,97 +1,358 @@
-# %%
-import yfinance as yf
-import pandas as pd 
-import numpy as np 
-
-# %%
-tickers=["MSFT","OR","EN.PA","CA","UL","SU","SAP","ALV.DE","EART.L","PAWD.L"]
-start_date="2019-01-01"
-end_date="2024-12-31"
-
-# %%
-def data_products(tickers, start=start_date, end=end_date):
-    
-    data = yf.download(tickers, start=start, end=end)["Close"]
-    
-    returns = data.ffill().pct_change().dropna().replace([np.inf, -np.inf], 0)  # Remplacement des valeurs infinies par 0
-
-    return returns
-returns=data_products(tickers,start_date,end_date)
-returns
-
-# %%
-
-def get_stock_statistics(tickers, start=start_date, end=end_date):
-    
-    data = yf.download(tickers, start=start, end=end)["Close"]
-    
-    returns = data.ffill().pct_change().dropna().replace([np.inf, -np.inf], 0)  # Remplacement des valeurs infinies par 0
-    
-    mean_returns = returns.mean()*252
-    var_matrix = returns.var()*252
-    cov_matrix = returns.cov()*np.sqrt(252)
-    corr_matrix = returns.corr()
-
-    return {
-        "returns": returns,
-        "mean_returns": mean_returns,
-        "variance": var_matrix,
-        "covariance_matrix": cov_matrix,
-        "correlation_matrix": corr_matrix
-    }
-
-stats = get_stock_statistics(tickers)
-print("Mean Returns:\n", stats["mean_returns"])
-print("\nCovariance Matrix:\n", stats["covariance_matrix"])
-print("\nCorrelation Matrix:\n", stats["correlation_matrix"])
-
-
-# %%
-
-def get_wallet_statistics(tickers, start=start_date, end=end_date,returns=stats):
-    data = yf.download(tickers, start=start, end=end)["Close"]
-
-    returns = data.ffill().pct_change().replace([np.inf, -np.inf], 0)
-    
-    weights = np.array([1/len(tickers)] * len(tickers))
-
-    annual_factor = 252
-
-    mean_daily_returns = returns.mean()
-    mean_annual_returns = mean_daily_returns * annual_factor
-
-    cov_matrix_daily = returns.cov()
-    cov_matrix_annual = cov_matrix_daily * annual_factor
-    corr_matrix = returns.corr()
-
-    port_daily_return = np.dot(weights, mean_daily_returns)
-    port_annual_return = port_daily_return * annual_factor
-
-    port_annual_variance = np.dot(weights.T, np.dot(cov_matrix_annual, weights))
-    port_annual_volatility = np.sqrt(port_annual_variance)
-
-    port_sharpe_ratio = (port_annual_return - 0.02) / port_annual_volatility
-
-    return {
-        "daily_returns": returns,
-        "mean_annual_returns": mean_annual_returns,
-        "cov_matrix_annual": cov_matrix_annual,
-        "correlation_matrix": corr_matrix,
-        "portfolio_annual_return": port_annual_return,
-        "portfolio_annual_volatility": port_annual_volatility,
-        "portfolio_annual_variance": port_annual_variance,
-        "portfolio_sharpe_ratio": port_sharpe_ratio
-    }
-
-# Run and print
-stats = get_wallet_statistics(tickers)
-
-print("=== Mean Annual Returns ===\n", stats["mean_annual_returns"])
-print("\n=== Annual Covariance Matrix ===\n", stats["cov_matrix_annual"])
-print("\n=== Correlation Matrix ===\n", stats["correlation_matrix"])
-print("\n=== Portfolio Annual Return ===\n", stats["portfolio_annual_return"])
-print("\n=== Portfolio Annual Volatility (Std Dev) ===\n", stats["portfolio_annual_volatility"])
-print("\n=== Portfolio Annual Variance ===\n", stats["portfolio_annual_variance"])
-
-
-
+# %%
+from collections.abc import Mapping
+from functools import lru_cache
+
+import pandas as pd
+import numpy as np
+
+import covariance
+import timing
+
+# %%
+tickers=["MSFT","OR","EN.PA","CA","UL","SU","SAP","ALV.DE","EART.L","PAWD.L"]
+start_date="2019-01-01"
+end_date="2024-12-31"
+# Convention unique pour toutes les statistiques annuelles : 252 séances, rendements et
+# covariances multipliés par 252, volatilités par sa racine
+ANNUAL_FACTOR = 252
+RISK_FREE_RATE = 0.02
+
+# %%
+class LazyStatistics(Mapping):
+    # Dictionnaire en lecture seule dont chaque champ n'est calculé qu'à sa première lecture.
+    # Chaque fonction reçoit l'objet lui-même, ce qui permet de réutiliser les champs déjà calculés.
+    def __init__(self, fields):
+        self._fields = dict(fields)
+        self._values = {}
+
+    def __getitem__(self, key):
+        if key not in self._values:
+            self._values[key] = self._fields[key](self)
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def is_computed(self, key):
+        return key in self._values
+
+    def __repr__(self):
+        computed = [key for key in self._fields if key in self._values]
+        return f"LazyStatistics(fields={list(self._fields)}, computed={computed})"
+
+
+_price_store = None
+
+
+def get_price_store():
+    # Le cache des cours est créé à la première utilisation (aucune I/O à l'import)
+    global _price_store
+    if _price_store is None:
+        from price_store import PriceStore
+
+        _price_store = PriceStore()
+    return _price_store
+
+
+def set_price_store(store):
+    # Permet de remplacer le cache, par exemple par un cache alimenté par un fournisseur local
+    global _price_store
+    _price_store = store
+    # Les MarketData mémorisés proviennent de l'ancien cache des cours
+    clear_market_data_cache()
+
+
+_asset_sources = None
+
+
+def get_asset_sources():
+    # Sources des actifs non cotés (SCPI, OAT vertes) ; les autres tickers passent par le cache des cours
+    global _asset_sources
+    if _asset_sources is None:
+        from asset_sources import load_periodic_returns
+
+        _asset_sources = [load_periodic_returns()]
+    return _asset_sources
+
+
+def set_asset_sources(sources):
+    global _asset_sources
+    _asset_sources = list(sources)
+    clear_market_data_cache()
+
+
+def _source_for(ticker):
+    return next((source for source in get_asset_sources() if source.covers(ticker)), None)
+
+
+def periodic_tickers(tickers):
+    # Actifs valorisés par une source de rendements périodiques (SCPI, OAT verte) : leur rendement
+    # journalier est lissé et leur volatilité quasi nulle, ils sont donc exclus de l'optimisation
+    # et de la simulation Monte Carlo
+    return [t for t in tickers if _source_for(t) is not None]
+
+
+def prefetch_prices(tickers, start=start_date, end=end_date):
+    # Télécharge en une seule fois (lots concurrents) tous les tickers dont une page aura besoin,
+    # et renvoie ceux pour lesquels aucune donnée n'a pu être obtenue
+    store = get_price_store()
+    store.get_close([t for t in tickers if _source_for(t) is None], start, end)
+    return store.last_missing
+
+
+def _download_close(tickers, start, end):
+    # Seules les périodes absentes du cache local sont téléchargées. Les actifs des autres sources sont
+    # ajoutés comme niveaux d'indice sur le calendrier des cours de marché (jours ouvrés à défaut).
+    by_source = {}
+    for ticker in tickers:
+        by_source.setdefault(_source_for(ticker), []).append(ticker)
+
+    market_tickers = by_source.pop(None, [])
+    if not by_source:
+        return get_price_store().get_close(market_tickers, start, end)
+    if market_tickers:
+        prices = get_price_store().get_close(market_tickers, start, end)
+        dates = prices.index
+    else:
+        dates = pd.bdate_range(start, end, inclusive="left", name="Date")
+        prices = pd.DataFrame(index=dates)
+    with timing.stage("periodic_sources"):
+        combined = pd.concat([prices] + [source.prices(source_tickers, dates) for source, source_tickers in by_source.items()], axis=1)
+    return combined[[t for t in tickers if t in combined]]
+
+
+# %%
+class MarketData:
+    # Étape unique du pipeline : panel de cours chargé une fois, nettoyé une fois.
+    # La matrice des rendements est partagée en lecture seule par toutes les statistiques.
+    def __init__(self, prices, dtype=np.float64):
+        with timing.stage("cleaning"):
+            # Un ticker sans aucun cours (téléchargement échoué) est écarté avant la suppression des
+            # lignes incomplètes, qui viderait sinon tout le panel
+            prices = prices.dropna(axis=1, how="all")
+            returns = prices.ffill().pct_change().dropna().replace([np.inf, -np.inf], 0)  # Remplacement des valeurs infinies par 0
+            values = np.ascontiguousarray(returns.to_numpy(dtype=dtype))
+            values.flags.writeable = False
+
+        self.prices = prices
+        self.tickers = list(returns.columns)
+        self.dates = returns.index
+        self.values = values
+        self._moments = None
+        self._covariances = {}
+
+    @property
+    def returns(self):
+        # DataFrame construit au-dessus de la matrice partagée, sans copie
+        return pd.DataFrame(self.values, index=self.dates, columns=self.tickers, copy=False)
+
+    def returns_array(self, dtype=None):
+        if dtype is None or np.dtype(dtype) == self.values.dtype:
+            return self.values
+        # Conversion explicite (float64 -> float32 par exemple) : une copie, elle aussi en lecture seule
+        values = self.values.astype(dtype)
+        values.flags.writeable = False
+        return values
+
+    def moments(self):
+        # Moyenne et covariance journalières, calculées une seule fois.
+        # La covariance passe par X'X, ce qui évite d'allouer une copie centrée de la matrice.
+        if self._moments is None:
+            with timing.stage("covariance"):
+                self._moments = self._compute_moments()
+        return self._moments
+
+    def covariance(self, estimator="sample", **params):
+        # Covariance journalière sous forme compacte (covariance.CovarianceModel), une par estimateur
+        key = (estimator, tuple(sorted(params.items())))
+        if key not in self._covariances:
+            with timing.stage("covariance"):
+                self._covariances[key] = covariance.estimate(self.values, estimator, self.tickers, **params)
+        return self._covariances[key]
+
+    def _compute_moments(self):
+        X = self.values
+        n = X.shape[0]
+        mean = X.mean(axis=0, dtype=np.float64)
+        cov = (X.T @ X).astype(np.float64)
+        cov -= n * np.outer(mean, mean)
+        cov /= n - 1
+        mean.flags.writeable = False
+        cov.flags.writeable = False
+        return mean, cov
+
+
+def load_prices(tickers, start=start_date, end=end_date):
+    # Panel brut des cours de clôture (une colonne par ticker, vide si aucun cours), sans nettoyage
+    if isinstance(tickers, str):
+        tickers = [tickers]
+    return _download_close(list(tickers), str(start), str(end))
+
+
+@lru_cache(maxsize=8)
+def _load_market_data(tickers, start, end, dtype):
+    return MarketData(_download_close(list(tickers), start, end), dtype=dtype)
+
+
+def load_market_data(tickers, start=start_date, end=end_date, dtype=np.float64):
+    # Les appels portant sur les mêmes tickers et la même période partagent le même MarketData
+    if isinstance(tickers, str):
+        tickers = [tickers]
+    return _load_market_data(tuple(tickers), str(start), str(end), np.dtype(dtype).name)
+
+
+def clear_market_data_cache():
+    _load_market_data.cache_clear()
+
+
+def _series(market, values):
+    return pd.Series(values, index=market.tickers)
+
+
+def _frame(market, values):
+    return pd.DataFrame(values, index=market.tickers, columns=market.tickers)
+
+
+def _corr_from_cov(cov):
+    cov = np.asarray(cov)
+    std = np.sqrt(np.diag(cov))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return cov / np.outer(std, std)
+
+
+# %%
+def data_products(tickers, start=start_date, end=end_date):
+
+    return load_market_data(tickers, start, end).returns
+
+# %%
+
+def _annual_covariance(market, estimator, params):
+    # Matrice N x N annuelle ; l'estimateur empirique réutilise la covariance de MarketData.moments
+    if estimator == "sample":
+        return market.moments()[1] * ANNUAL_FACTOR
+    return market.covariance(estimator, **params).scaled(ANNUAL_FACTOR).to_dense()
+
+
+def get_stock_statistics(tickers, start=start_date, end=end_date, dtype=np.float64, estimator="sample", **estimator_params):
+    # `estimator` : "sample", "ledoit_wolf", "ewma" ou "factor" (voir covariance.py) ;
+    # "covariance_model" donne la forme compacte, sans matrice N x N
+    market = lambda: load_market_data(tickers, start, end, dtype)
+
+    return LazyStatistics({
+        "returns": lambda s: market().returns,
+        "mean_returns": lambda s: _series(market(), market().moments()[0]*ANNUAL_FACTOR),
+        "variance": lambda s: _series(market(), np.diag(market().moments()[1]) * ANNUAL_FACTOR if estimator == "sample"
+                                      else s["covariance_model"].diagonal()),
+        "covariance_model": lambda s: market().covariance(estimator, **estimator_params).scaled(ANNUAL_FACTOR),
+        "covariance_matrix": lambda s: _frame(market(), _annual_covariance(market(), estimator, estimator_params)),
+        "correlation_matrix": lambda s: _frame(market(), _corr_from_cov(s["covariance_matrix"])),
+    })
+
+
+# %%
+
+def get_wallet_statistics(tickers, start=start_date, end=end_date, dtype=np.float64, weights=None,
+                          estimator="sample", **estimator_params):
+
+    market = lambda: load_market_data(tickers, start, end, dtype)
+
+    def wallet_weights(s):
+        # Poids des actifs effectivement présents dans le panel (équipondéré par défaut) ;
+        # les poids des tickers écartés faute de cours sont répartis sur les autres
+        if weights is None:
+            return np.full(len(market().tickers), 1 / len(market().tickers))
+        w = pd.Series(np.asarray(weights, dtype=np.float64), index=[tickers] if isinstance(tickers, str) else tickers)
+        kept = w[market().tickers].to_numpy()
+        return kept * (w.sum() / kept.sum()) if len(kept) < len(w) else kept
+
+    def port_annual_return(s):
+        mean_daily_returns, _ = market().moments()
+        port_daily_return = np.dot(s["weights"], mean_daily_returns)
+        return port_daily_return * ANNUAL_FACTOR
+
+    def port_annual_variance(s):
+        # Covariance empirique : la matrice N x N des moments suffit tant qu'elle n'est pas plus grosse que
+        # le panel (N <= T) ; au-delà, et pour les autres estimateurs, w' Σ w passe par la forme compacte
+        values = market().values
+        if estimator == "sample" and values.shape[1] <= values.shape[0]:
+            w = s["weights"]
+            return max(float(w @ market().moments()[1] @ w), 0.0) * ANNUAL_FACTOR
+        return max(s["covariance_model"].variance(s["weights"]), 0.0)
+
+    return LazyStatistics({
+        "weights": wallet_weights,
+        "daily_returns": lambda s: market().returns,
+        "mean_annual_returns": lambda s: _series(market(), market().moments()[0] * ANNUAL_FACTOR),
+        "covariance_model": lambda s: market().covariance(estimator, **estimator_params).scaled(ANNUAL_FACTOR),
+        "cov_matrix_annual": lambda s: _frame(market(), _annual_covariance(market(), estimator, estimator_params)),
+        "correlation_matrix": lambda s: _frame(market(), _corr_from_cov(s["cov_matrix_annual"])),
+        "portfolio_annual_return": port_annual_return,
+        "portfolio_annual_volatility": lambda s: np.sqrt(s["portfolio_annual_variance"]),
+        "portfolio_annual_variance": port_annual_variance,
+        "portfolio_sharpe_ratio": lambda s: (s["portfolio_annual_return"] - RISK_FREE_RATE) / s["portfolio_annual_volatility"],
+    })
+
+# %%
+
+def portfolio_statistics(weights, mean_daily_returns, cov_matrix_daily, annual_factor=ANNUAL_FACTOR,
+                         risk_free_rate=RISK_FREE_RATE):
+    # Rendement, volatilité et ratio de Sharpe annuels de P portefeuilles en une seule passe.
+    # `weights` est une matrice P x N (ou un vecteur N) ; la variance est w' C w pour chaque ligne.
+    # `cov_matrix_daily` peut être une matrice ou un covariance.CovarianceModel (sans matrice N x N).
+    W = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+
+    annual_return = W @ (np.asarray(mean_daily_returns, dtype=np.float64) * annual_factor)
+    if isinstance(cov_matrix_daily, covariance.CovarianceModel):
+        annual_variance = cov_matrix_daily.variance(W) * annual_factor
+    else:
+        cov_matrix_annual = np.asarray(cov_matrix_daily, dtype=np.float64) * annual_factor
+        annual_variance = np.einsum("pi,pi->p", W @ cov_matrix_annual, W)
+    # Quand il y a plus de titres que de dates, la covariance est singulière et l'arrondi peut donner
+    # une variance très légèrement négative au portefeuille de variance minimale : on la borne à 0
+    annual_variance = np.maximum(annual_variance, 0.0)
+    annual_volatility = np.sqrt(annual_variance)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe_ratio = (annual_return - risk_free_rate) / annual_volatility
+
+    return {
+        "annual_return": annual_return,
+        "annual_variance": annual_variance,
+        "annual_volatility": annual_volatility,
+        "sharpe_ratio": sharpe_ratio,
+    }
+
+
+def get_portfolios_statistics(tickers, weights, start=start_date, end=end_date, dtype=np.float64,
+                              estimator="sample", **estimator_params):
+    # Variante de get_wallet_statistics pour un lot de vecteurs de poids (une ligne par portefeuille).
+    # La moyenne et la covariance proviennent du MarketData mémorisé : aucun nouveau téléchargement.
+    market = load_market_data(tickers, start, end, dtype)
+    mean_daily_returns, cov_matrix_daily = market.moments()
+    if estimator != "sample":
+        cov_matrix_daily = market.covariance(estimator, **estimator_params)
+    return portfolio_statistics(weights, mean_daily_returns, cov_matrix_daily)
+
+# %%
+if __name__ == "__main__":
+    returns=data_products(tickers,start_date,end_date)
+    print(returns)
+
+    stats = get_stock_statistics(tickers)
+    print("Mean Returns:\n", stats["mean_returns"])
+    print("\nCovariance Matrix:\n", stats["covariance_matrix"])
+    print("\nCorrelation Matrix:\n", stats["correlation_matrix"])
+
+    # Run and print
+    stats = get_wallet_statistics(tickers)
+
+    print("=== Mean Annual Returns ===\n", stats["mean_annual_returns"])
+    print("\n=== Annual Covariance Matrix ===\n", stats["cov_matrix_annual"])
+    print("\n=== Correlation Matrix ===\n", stats["correlation_matrix"])
+    print("\n=== Portfolio Annual Return ===\n", stats["portfolio_annual_return"])
+    print("\n=== Portfolio Annual Volatility (Std Dev) ===\n", stats["portfolio_annual_volatility"])
+    print("\n=== Portfolio Annual Variance ===\n", stats["portfolio_annual_variance"])
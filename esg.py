@@ -0,0 +1,201 @@
+# Données ESG des actifs, chargées depuis data/esg.csv.
+#
+# Les champs utilisés dans les calculs sont rangés dans un tableau structuré NumPy (codes entiers,
+# booléens, float32), une ligne par émetteur ; les textes restent dans un DataFrame à part.
+# Toutes les moyennes pondérées acceptent un vecteur de poids ou une matrice (un portefeuille par
+# ligne) et sont calculées sans boucle Python, y compris sur un univers de plusieurs milliers d'émetteurs.
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_ESG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "esg.csv")
+
+ASSET_CLASSES = ("equity", "fund", "bond", "scpi")
+MSCI_RATINGS = ("CCC", "B", "BB", "BBB", "A", "AA", "AAA")
+# Drapeaux de controverse MSCI, du meilleur au pire
+CONTROVERSY_FLAGS = ("G", "Y", "O", "R")
+CONTROVERSY_LABELS = {
+    "G": "G (green, très bien)",
+    "Y": "Y (yellow, modéré)",
+    "O": "O (orange, modéré à élevé)",
+    "R": "R (red, très élevé)",
+}
+PILLARS = ("Environnement", "Social", "Gouvernance")
+
+ESG_DTYPE = np.dtype([
+    ("asset_class", "i1"),
+    ("msci_rating", "i1"),           # rang dans MSCI_RATINGS, -1 si absent
+    ("controversy", "i1", (3,)),     # rang dans CONTROVERSY_FLAGS pour E, S, G ; -1 si absent
+    ("tobacco", "?"),
+    ("alcohol", "?"),
+    ("controversial_other", "?"),    # autre secteur controversé (armement, charbon, ...)
+    ("decarbonization_year", "i2"),  # 0 si aucun objectif
+    ("emissions_coverage", "f4"),    # part des émissions (scopes 1, 2, 3) couverte par l'objectif, en %
+    ("implied_temperature", "f4"),   # NaN si non disponible
+    ("sfdr_article", "i1"),          # 0 si non applicable
+    ("greenfin", "?"),
+    ("isr", "?"),
+])
+
+_TEXT_COLUMNS = ["name", "issuer", "isin", "rating_comment", "target_comment", "description"]
+
+
+def rating_at_least(rating, minimum):
+    return rating in MSCI_RATINGS and MSCI_RATINGS.index(rating) >= MSCI_RATINGS.index(minimum)
+
+
+def _codes(values, labels):
+    lookup = {label: i for i, label in enumerate(labels)}
+    return np.array([lookup.get(v, -1) for v in values], dtype=np.int8)
+
+
+class ESGStore:
+    def __init__(self, tickers, records, text):
+        self.tickers = pd.Index(tickers)
+        self.records = records
+        self.text = text
+
+    @classmethod
+    def from_frame(cls, frame):
+        # Construction à partir d'un DataFrame ayant les colonnes de data/esg.csv
+        frame = frame.reset_index(drop=True)
+        records = np.zeros(len(frame), dtype=ESG_DTYPE)
+        records["asset_class"] = _codes(frame["asset_class"], ASSET_CLASSES)
+        records["msci_rating"] = _codes(frame["msci_rating"].fillna(""), MSCI_RATINGS)
+        for i, pillar in enumerate(("controversy_e", "controversy_s", "controversy_g")):
+            records["controversy"][:, i] = _codes(frame[pillar].fillna(""), CONTROVERSY_FLAGS)
+        for flag in ("tobacco", "alcohol", "controversial_other", "greenfin", "isr"):
+            records[flag] = frame[flag].fillna(0).astype(bool)
+        records["decarbonization_year"] = frame["decarbonization_year"].fillna(0).astype(np.int16)
+        records["emissions_coverage"] = frame["emissions_coverage"].astype(np.float32)
+        records["implied_temperature"] = frame["implied_temperature"].astype(np.float32)
+        records["sfdr_article"] = frame["sfdr_article"].fillna(0).astype(np.int8)
+
+        text = frame.reindex(columns=_TEXT_COLUMNS).fillna("").set_index(frame["ticker"])
+        return cls(frame["ticker"], records, text)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, ticker):
+        return ticker in self.tickers
+
+    def positions(self, tickers):
+        # Positions des tickers dans le tableau (recherche vectorisée par l'index pandas)
+        positions = self.tickers.get_indexer(pd.Index(tickers))
+        if (positions < 0).any():
+            unknown = [t for t, p in zip(tickers, positions) if p < 0]
+            raise KeyError(f"Tickers absents des données ESG : {unknown}")
+        return positions
+
+    def subset(self, tickers):
+        positions = self.positions(tickers)
+        return ESGStore(self.tickers[positions], self.records[positions], self.text.iloc[positions])
+
+    def weighted_average(self, values, weights, tickers=None):
+        # Moyenne pondérée d'un champ numérique ; les actifs sans valeur (NaN) sont exclus
+        # et les poids restants renormalisés. `weights` : vecteur N ou matrice P x N.
+        values = np.asarray(values, dtype=np.float64)
+        if tickers is not None:
+            values = values[self.positions(tickers)]
+        W = np.asarray(weights, dtype=np.float64)
+        available = ~np.isnan(values)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = (W @ np.where(available, values, 0.0)) / (W @ available)
+        return result
+
+    def weighted_temperature(self, weights, tickers=None):
+        # Température implicite du portefeuille, pondérée par le poids de chaque actif
+        return self.weighted_average(self.records["implied_temperature"], weights, tickers)
+
+    def weighted_rating(self, weights, tickers=None):
+        # Note MSCI moyenne pondérée, sur l'échelle 0 (CCC) à 6 (AAA)
+        ratings = self.records["msci_rating"].astype(np.float64)
+        ratings[ratings < 0] = np.nan
+        return self.weighted_average(ratings, weights, tickers)
+
+    @staticmethod
+    def rating_label(score):
+        # Conversion d'une note moyenne (0 à 6) vers la note MSCI la plus proche
+        return MSCI_RATINGS[int(np.clip(np.rint(score), 0, len(MSCI_RATINGS) - 1))]
+
+    def record(self, ticker):
+        position = self.positions([ticker])[0]
+        row = self.records[position]
+        text = self.text.iloc[position]
+        return {
+            "ticker": ticker,
+            "name": text["name"],
+            "asset_class": ASSET_CLASSES[row["asset_class"]] if row["asset_class"] >= 0 else None,
+            "issuer": text["issuer"],
+            "isin": text["isin"],
+            "msci_rating": MSCI_RATINGS[row["msci_rating"]] if row["msci_rating"] >= 0 else None,
+            "controversy": {pillar: CONTROVERSY_FLAGS[code] if code >= 0 else None
+                            for pillar, code in zip(PILLARS, row["controversy"])},
+            "tobacco": bool(row["tobacco"]),
+            "alcohol": bool(row["alcohol"]),
+            "controversial_other": bool(row["controversial_other"]),
+            "decarbonization_year": int(row["decarbonization_year"]) or None,
+            "emissions_coverage": None if np.isnan(row["emissions_coverage"]) else float(row["emissions_coverage"]),
+            "implied_temperature": None if np.isnan(row["implied_temperature"]) else float(row["implied_temperature"]),
+            "sfdr_article": int(row["sfdr_article"]) or None,
+            "greenfin": bool(row["greenfin"]),
+            "isr": bool(row["isr"]),
+            "rating_comment": text["rating_comment"],
+            "target_comment": text["target_comment"],
+            "description": text["description"],
+        }
+
+    def describe(self, ticker):
+        # Fiche descriptive (markdown) affichée sur la page Détails du portefeuille
+        r = self.record(ticker)
+        if r["asset_class"] != "equity":
+            labels = []
+            if r["sfdr_article"]:
+                labels.append(f"Article {r['sfdr_article']} SFDR")
+            if r["greenfin"]:
+                labels.append("Greenfin")
+            if r["isr"]:
+                labels.append("ISR")
+            lines = [f"- Nom : {r['name']}"]
+            if r["issuer"]:
+                lines.append(f"- Émetteur : {r['issuer']}")
+            if r["isin"]:
+                lines.append(f"- ISIN : {r['isin']}")
+            lines.append(f"- Label : {', '.join(labels)}")
+            lines.append(f"- Objectif d'investissement : {r['description']}")
+            return "  \n".join(lines)
+
+        lines = [f"Nom : {r['name']}"]
+        if r["decarbonization_year"]:
+            coverage = f"{r['emissions_coverage']:.0f} %".replace(".", ",")
+            lines.append(f"- Objectif de décarbonation : Oui, objectif fixé à {r['decarbonization_year']}, couvrant "
+                         f"{coverage} des émissions (Scopes 1, 2 et 3), {r['target_comment']}")
+        else:
+            lines.append("- Objectif de décarbonation : Non")
+        if r["implied_temperature"] is not None:
+            temperature = f"{r['implied_temperature']:.1f}".replace(".", ",")
+            lines.append(f"- Température implicite : {temperature}°C — trajectoire "
+                         f"{'alignée' if r['implied_temperature'] <= 1.5 else 'non alignée'} avec les objectifs climatiques internationaux")
+        lines.append(f"- Note ESG MSCI : {r['msci_rating']}. {r['rating_comment']}")
+        lines.append("- Controverses ESG : " + ", ".join(
+            f"{pillar} : {CONTROVERSY_LABELS.get(flag, 'non disponible')}" for pillar, flag in r["controversy"].items()))
+        sectors = [name for name, flag in (("du tabac", r["tobacco"]), ("de l’alcool", r["alcohol"])) if flag]
+        if sectors:
+            decision = ("Maintenu dans le portefeuille car sa note ESG est supérieure ou égale à AA"
+                        if rating_at_least(r["msci_rating"], "AA") else
+                        "Exclu du portefeuille car sa note ESG est inférieure à AA")
+            lines.append(f"- Activités controversées : Implication dans les secteurs {' et '.join(sectors)}. "
+                         f"{decision}, conformément à notre politique de sélection")
+        elif r["controversial_other"]:
+            lines.append("- Activités controversées : Implication dans des activités controversées selon MSCI")
+        else:
+            lines.append("- Activités controversées : Aucune implication dans des activités controversées selon MSCI")
+        return "  \n".join(lines)
+
+
+@lru_cache(maxsize=4)
+def load_esg(path=DEFAULT_ESG_PATH):
+    return ESGStore.from_frame(pd.read_csv(path, encoding="utf-8"))
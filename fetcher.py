@@ -0,0 +1,125 @@
+# Téléchargement concurrent des cours, par lots de tickers, sur un pool de threads.
+#
+# - chaque thread garde son propre fournisseur d'un appel à l'autre ; les appels à yf.download sont
+#   toutefois sérialisés (price_store.YahooProvider), yfinance parallélisant lui-même par ticker ;
+# - les erreurs et les tickers sans données sont retentés avec un délai exponentiel (limitation de débit) ;
+# - les tickers toujours absents sont demandés aux sources suivantes, puis signalés comme manquants
+#   sans invalider le reste du panel.
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from price_store import YahooProvider
+
+FetchResult = namedtuple("FetchResult", ["prices", "missing", "errors"])
+
+
+def yahoo_source():
+    # La session HTTP est celle du singleton YfData de yfinance, commune à tous les threads
+    return YahooProvider()
+
+
+def _missing(frame, tickers):
+    return [t for t in tickers if t not in frame or frame[t].isna().all()]
+
+
+class ConcurrentProvider:
+    def __init__(self, sources=(yahoo_source,), batch_size=10, max_workers=4, retries=3,
+                 backoff=0.5, max_backoff=8.0, sleep=time.sleep):
+        # `sources` : fabriques de fournisseurs, par ordre de préférence (un fournisseur par thread)
+        self.sources = list(sources)
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sleep = sleep
+        self.last_missing = []
+        self.last_errors = {}
+        self._local = threading.local()
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _provider(self, source_index):
+        providers = getattr(self._local, "providers", None)
+        if providers is None:
+            providers = self._local.providers = {}
+        if source_index not in providers:
+            providers[source_index] = self.sources[source_index]()
+        return providers[source_index]
+
+    def _pool(self):
+        # Pool créé au premier appel et conservé : les threads (et leurs fournisseurs) sont réutilisés
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fetcher")
+            return self._executor
+
+    def _fetch_batch(self, source_index, tickers, start, end):
+        # Un lot : nouvelles tentatives avec délai exponentiel et gigue, seulement pour les tickers manquants
+        frames, errors = [], {}
+        remaining = list(tickers)
+        for attempt in range(self.retries + 1):
+            try:
+                frame = self._provider(source_index).fetch(remaining, start, end)
+                if not len(frame):
+                    # Aucune séance dans la période (avant le début de l'historique, week-end, jour
+                    # férié) : réponse valide, sans nouvelle tentative, comme dans PriceStore
+                    frames.append(pd.DataFrame(index=pd.DatetimeIndex([], name="Date"), columns=remaining,
+                                               dtype="float64"))
+                    remaining = []
+                    break
+                present = [t for t in remaining if t not in _missing(frame, remaining)]
+                if present:
+                    frames.append(frame[present])
+                remaining = [t for t in remaining if t not in present]
+            except Exception as error:
+                for ticker in remaining:
+                    errors[ticker] = repr(error)
+            if not remaining or attempt == self.retries:
+                break
+            delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+            self.sleep(delay * (0.5 + random.random() / 2))
+        for ticker in tickers:
+            if ticker not in remaining:
+                errors.pop(ticker, None)
+        return frames, remaining, errors
+
+    def fetch_report(self, tickers, start, end):
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        frames, errors = [], {}
+        remaining = tickers
+        for source_index in range(len(self.sources)):
+            if not remaining:
+                break
+            batches = [remaining[i:i + self.batch_size] for i in range(0, len(remaining), self.batch_size)]
+            futures = [self._pool().submit(self._fetch_batch, source_index, batch, start, end) for batch in batches]
+            remaining = []
+            for future in futures:
+                batch_frames, batch_missing, batch_errors = future.result()
+                frames.extend(batch_frames)
+                remaining.extend(batch_missing)
+                errors.update(batch_errors)
+
+        prices = pd.concat(frames, axis=1).sort_index() if frames else pd.DataFrame(index=pd.DatetimeIndex([], name="Date"))
+        prices = prices.loc[:, ~prices.columns.duplicated()]
+        # Les tickers manquants sont absents du panel : PriceStore ne les marque pas comme couverts
+        prices = prices.reindex(columns=[t for t in tickers if t not in remaining])
+        errors = {t: e for t, e in errors.items() if t in remaining}
+        return FetchResult(prices, remaining, errors)
+
+    def fetch(self, tickers, start, end):
+        result = self.fetch_report(tickers, start, end)
+        self.last_missing = result.missing
+        self.last_errors = result.errors
+        return result.prices
+
+    def close(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
@@ -0,0 +1,198 @@
+# Simulation Monte Carlo du portefeuille : VaR / CVaR et cônes de percentiles sur 1 à 10 ans.
+#
+# - paramétrique : rendements multivariés normaux construits avec le facteur de Cholesky de
+#   cov_matrix_annual et mean_annual_returns (ramenés au pas de simulation) ;
+# - bootstrap : tirage avec remise de blocs historiques de rendements (un bloc = un pas).
+#
+# Les trajectoires sont simulées par paquets dans un pool de processus. Chaque paquet a son propre
+# flux aléatoire (SeedSequence.spawn) : le résultat ne dépend que de la graine, pas du nombre de
+# processus. Aucun paquet ne renvoie ses trajectoires : seuls des histogrammes de la richesse à
+# chaque pas sont agrégés, ce qui borne la mémoire quel que soit le nombre de trajectoires.
+import os
+
+import numpy as np
+import pandas as pd
+
+import parallel
+import timing
+from data_finance_verte import ANNUAL_FACTOR
+
+PERCENTILES = (5, 25, 50, 75, 95)
+# Histogramme du log de la richesse : de e^-6 à e^6 fois la mise initiale
+_LOG_MIN, _LOG_MAX, _BINS = -6.0, 6.0, 6000
+
+
+class WealthHistogram:
+    # Agrégat fusionnable de la distribution de la richesse à chaque pas de temps.
+    # Les sommes par case permettent un calcul de la CVaR sans conserver les trajectoires.
+    def __init__(self, n_steps):
+        self.counts = np.zeros((n_steps, _BINS + 2), dtype=np.int64)  # + cases de dépassement bas et haut
+        self.sums = np.zeros((n_steps, _BINS + 2))
+        self.edges = np.linspace(_LOG_MIN, _LOG_MAX, _BINS + 1)
+
+    def add(self, step, wealth):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            position = (np.log(wealth) - _LOG_MIN) * (_BINS / (_LOG_MAX - _LOG_MIN))
+        # Case 0 : dépassement bas (richesse nulle comprise), case _BINS + 1 : dépassement haut
+        bins = np.clip(np.floor(np.nan_to_num(position, neginf=-1.0)), -1, _BINS).astype(np.intp) + 1
+        self.counts[step] += np.bincount(bins, minlength=_BINS + 2)
+        self.sums[step] += np.bincount(bins, weights=wealth, minlength=_BINS + 2)
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.sums += other.sums
+        return self
+
+    def mean(self):
+        return self.sums.sum(axis=1) / self.counts.sum(axis=1)
+
+    def _locate(self, step, q):
+        counts = self.counts[step]
+        cumulative = np.cumsum(counts)
+        target = q * cumulative[-1]
+        b = int(np.searchsorted(cumulative, target, side="left"))
+        before = cumulative[b - 1] if b > 0 else 0
+        fraction = (target - before) / counts[b] if counts[b] else 0.0
+        return b, fraction
+
+    def quantile(self, step, q):
+        b, fraction = self._locate(step, q)
+        if b == 0:
+            return float(np.exp(_LOG_MIN))
+        if b == _BINS + 1:
+            return float(np.exp(_LOG_MAX))
+        # Interpolation linéaire du log de la richesse à l'intérieur de la case
+        return float(np.exp(self.edges[b - 1] + fraction * (self.edges[b] - self.edges[b - 1])))
+
+    def tail_mean(self, step, q):
+        # Richesse moyenne des q % pires trajectoires (valeurs supposées uniformes dans la case limite)
+        b, fraction = self._locate(step, q)
+        tail_sum = self.sums[step, :b].sum() + fraction * self.sums[step, b]
+        tail_count = self.counts[step, :b].sum() + fraction * self.counts[step, b]
+        return float(tail_sum / tail_count) if tail_count else float("nan")
+
+
+def _simulate_chunk(task):
+    # Exécuté dans un processus du pool : simule `n_paths` trajectoires pas à pas
+    seed, n_paths, n_steps, weights, rebalance, method, params = task
+    rng = np.random.default_rng(seed)
+    histogram = WealthHistogram(n_steps)
+
+    if rebalance:
+        wealth = np.ones(n_paths)
+    else:
+        holdings = np.tile(weights, (n_paths, 1))
+
+    if method == "parametric":
+        mean_step, cholesky = params
+        # Avec rééquilibrage, le rendement du portefeuille est normal de moyenne w'mu et d'écart-type
+        # ||L'w|| : un seul tirage par trajectoire au lieu d'un par actif
+        portfolio_mean, portfolio_std = mean_step @ weights, np.linalg.norm(cholesky.T @ weights)
+
+    for step in range(n_steps):
+        if method == "parametric" and rebalance:
+            wealth *= 1 + np.maximum(portfolio_mean + portfolio_std * rng.standard_normal(n_paths), -1.0)
+            histogram.add(step, wealth)
+            continue
+
+        if method == "parametric":
+            asset_returns = mean_step + rng.standard_normal((n_paths, len(weights))) @ cholesky.T
+        else:
+            block_returns = params
+            asset_returns = block_returns[rng.integers(0, len(block_returns), n_paths)]
+        asset_returns = np.maximum(asset_returns, -1.0)  # une perte ne peut excéder la mise
+
+        if rebalance:
+            wealth *= 1 + asset_returns @ weights
+        else:
+            holdings *= 1 + asset_returns
+            wealth = holdings.sum(axis=1)
+        histogram.add(step, wealth)
+
+    return histogram
+
+
+@timing.timed("monte_carlo")
+def simulate(weights, mean_annual_returns=None, cov_matrix_annual=None, daily_returns=None, method="parametric",
+             horizon_years=10, steps_per_year=12, n_paths=1_000_000, chunk_size=50_000, seed=0,
+             processes=None, rebalance=True, confidence=0.95):
+    weights = np.asarray(weights, dtype=np.float64)
+    n_steps = int(round(horizon_years * steps_per_year))
+
+    if method == "parametric":
+        mean_step = np.asarray(mean_annual_returns, dtype=np.float64) / steps_per_year
+        cov_step = np.asarray(cov_matrix_annual, dtype=np.float64) / steps_per_year
+        # Petite régularisation si la covariance n'est pas strictement définie positive
+        jitter = 1e-12 * np.trace(cov_step) / len(cov_step)
+        cholesky = np.linalg.cholesky(cov_step + jitter * np.eye(len(cov_step)))
+        params = (mean_step, cholesky)
+    elif method == "bootstrap":
+        # Blocs de `days` séances consécutives, composés une fois pour toutes avant la simulation
+        days = max(1, int(round(ANNUAL_FACTOR / steps_per_year)))
+        log_returns = np.log1p(np.asarray(daily_returns, dtype=np.float64))
+        cumulative = np.vstack([np.zeros(log_returns.shape[1]), np.cumsum(log_returns, axis=0)])
+        params = np.expm1(cumulative[days:] - cumulative[:-days])
+    else:
+        raise ValueError(f"Méthode inconnue : {method!r} (attendu 'parametric' ou 'bootstrap')")
+
+    n_chunks = -(-n_paths // chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    sizes = [min(chunk_size, n_paths - i * chunk_size) for i in range(n_chunks)]
+    tasks = [(s, size, n_steps, weights, rebalance, method, params) for s, size in zip(seeds, sizes)]
+
+    processes = processes or os.cpu_count() or 1
+    histogram = WealthHistogram(n_steps)
+    if processes == 1 or n_chunks == 1:
+        for task in tasks:
+            histogram.merge(_simulate_chunk(task))
+    else:
+        # Au plus deux paquets en attente par processus : les histogrammes partiels sont fusionnés
+        # au fil de l'eau au lieu de s'accumuler en mémoire
+        with parallel.process_pool(min(processes, n_chunks)) as pool:
+            for partial in parallel.bounded_map(pool, _simulate_chunk, tasks, 2 * processes):
+                histogram.merge(partial)
+
+    return _summarize(histogram, n_steps, steps_per_year, n_paths, confidence)
+
+
+def _summarize(histogram, n_steps, steps_per_year, n_paths, confidence):
+    years = (np.arange(n_steps) + 1) / steps_per_year
+    alpha = 1 - confidence
+
+    fan = pd.DataFrame(
+        {p: [histogram.quantile(step, p / 100) for step in range(n_steps)] for p in PERCENTILES},
+        index=pd.Index(years, name="years"),
+    )
+    fan.loc[0.0] = 1.0
+    fan = fan.sort_index()
+
+    # VaR et CVaR exprimées en perte relative de la mise initiale, à la fin de chaque année
+    year_ends = [step for step in range(n_steps) if (step + 1) % steps_per_year == 0]
+    var = pd.Series([1 - histogram.quantile(step, alpha) for step in year_ends],
+                    index=pd.Index(years[year_ends], name="years"))
+    cvar = pd.Series([1 - histogram.tail_mean(step, alpha) for step in year_ends], index=var.index)
+
+    return {
+        "percentiles": fan,
+        "mean_wealth": pd.Series(histogram.mean(), index=pd.Index(years, name="years")),
+        "var": var,
+        "cvar": cvar,
+        "confidence": confidence,
+        "n_paths": n_paths,
+    }
+
+
+def simulate_wallet(wallet_stats, method="parametric", **kwargs):
+    # Simulation à partir des statistiques de dfv.get_wallet_statistics (portefeuille équipondéré par défaut)
+    mean = wallet_stats["mean_annual_returns"]
+    weights = kwargs.pop("weights", None)
+    if weights is None:
+        weights = np.full(len(mean), 1 / len(mean))
+    return simulate(
+        weights,
+        mean_annual_returns=mean,
+        cov_matrix_annual=wallet_stats["cov_matrix_annual"],
+        daily_returns=wallet_stats["daily_returns"] if method == "bootstrap" else None,
+        method=method,
+        **kwargs,
+    )
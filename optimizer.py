@@ -0,0 +1,178 @@
+# Optimisation moyenne-variance sans vente à découvert (poids >= 0, somme des poids = 1).
+#
+# Les portefeuilles sont obtenus par une méthode d'ensemble actif sur le programme quadratique
+#     min 1/2 w' C w + c' w   sous   A w = b,  w >= 0
+# Chaque itération résout le système KKT restreint aux actifs « libres » (poids > 0), de taille
+# bien inférieure au nombre d'actifs sur la frontière. Les points successifs de la frontière
+# repartent de la solution précédente, ce qui limite le travail à quelques itérations par point.
+import numpy as np
+import pandas as pd
+
+import data_finance_verte as dfv
+import timing
+
+_TOL = 1e-10
+
+
+def _solve_kkt(Q, c, A, b, free):
+    # Minimiseur du problème restreint aux actifs libres, avec les contraintes d'égalité A w = b
+    Q_ff = Q[np.ix_(free, free)]
+    A_f = A[:, free]
+    m = A.shape[0]
+    kkt = np.block([[Q_ff, A_f.T], [A_f, np.zeros((m, m))]])
+    rhs = np.concatenate([-c[free], b])
+    try:
+        solution = np.linalg.solve(kkt, rhs)
+    except np.linalg.LinAlgError:
+        solution = np.linalg.lstsq(kkt, rhs, rcond=None)[0]
+    return solution[:len(free)], solution[len(free):]
+
+
+def _active_set_qp(Q, c, A, b, x0, max_iter=None):
+    # x0 doit être réalisable (A x0 = b, x0 >= 0)
+    n = len(x0)
+    x = np.clip(np.asarray(x0, dtype=np.float64), 0.0, None)
+    free = x > _TOL
+    max_iter = max_iter or 10 * n + 100
+
+    for _ in range(max_iter):
+        free_idx = np.flatnonzero(free)
+        x_free, nu = _solve_kkt(Q, c, A, b, free_idx)
+        step = x_free - x[free_idx]
+
+        if np.max(np.abs(step), initial=0.0) < 1e-12:
+            # Multiplicateurs des contraintes w_i >= 0 : tous positifs à l'optimum
+            gradient = Q @ x + c + A.T @ nu
+            bound_idx = np.flatnonzero(~free)
+            if len(bound_idx) == 0:
+                break
+            worst = bound_idx[np.argmin(gradient[bound_idx])]
+            if gradient[worst] >= -1e-10:
+                break
+            free[worst] = True
+            continue
+
+        # Pas le plus long possible sans rendre un poids négatif
+        decreasing = step < 0
+        ratios = np.full(len(step), np.inf)
+        ratios[decreasing] = -x[free_idx][decreasing] / step[decreasing]
+        blocking = int(np.argmin(ratios))
+        alpha = min(1.0, ratios[blocking])
+
+        x[free_idx] += alpha * step
+        if alpha < 1.0:
+            x[free_idx[blocking]] = 0.0
+            free[free_idx[blocking]] = False
+
+    x[x < 0] = 0.0
+    return x
+
+
+def _as_arrays(mean_annual_returns, cov_matrix_annual):
+    mean = np.asarray(mean_annual_returns, dtype=np.float64)
+    cov = np.asarray(cov_matrix_annual, dtype=np.float64)
+    index = getattr(mean_annual_returns, "index", None)
+    return mean, cov, index
+
+
+def _result(weights, mean, cov, index, risk_free_rate):
+    stats = dfv.portfolio_statistics(weights, mean, cov, annual_factor=1, risk_free_rate=risk_free_rate)
+    return {
+        "weights": pd.Series(weights, index=index),
+        "annual_return": stats["annual_return"][0],
+        "annual_volatility": stats["annual_volatility"][0],
+        "sharpe_ratio": stats["sharpe_ratio"][0],
+    }
+
+
+def _target_start(mean, target, previous=None):
+    # Point de départ réalisable pour la contrainte de rendement cible : on mélange la solution
+    # précédente (ou l'actif le moins rentable) avec l'actif dont le rendement encadre la cible.
+    n = len(mean)
+    if previous is None:
+        previous = np.zeros(n)
+        previous[np.argmin(mean)] = 1.0
+    current = previous @ mean
+    toward = np.zeros(n)
+    toward[np.argmax(mean) if target >= current else np.argmin(mean)] = 1.0
+    gap = toward @ mean - current
+    theta = 0.0 if abs(gap) < _TOL else np.clip((target - current) / gap, 0.0, 1.0)
+    return (1 - theta) * previous + theta * toward
+
+
+def min_variance_portfolio(mean_annual_returns, cov_matrix_annual, risk_free_rate=dfv.RISK_FREE_RATE):
+    mean, cov, index = _as_arrays(mean_annual_returns, cov_matrix_annual)
+    n = len(mean)
+    weights = _active_set_qp(cov, np.zeros(n), np.ones((1, n)), np.ones(1), np.full(n, 1 / n))
+    return _result(weights, mean, cov, index, risk_free_rate)
+
+
+def target_return_portfolio(mean_annual_returns, cov_matrix_annual, target_return, risk_free_rate=dfv.RISK_FREE_RATE,
+                            start=None):
+    # Portefeuille de variance minimale atteignant `target_return` (borné par le rendement maximal)
+    mean, cov, index = _as_arrays(mean_annual_returns, cov_matrix_annual)
+    n = len(mean)
+    target = float(np.clip(target_return, mean.min(), mean.max()))
+    A = np.vstack([np.ones(n), mean])
+    b = np.array([1.0, target])
+    weights = _active_set_qp(cov, np.zeros(n), A, b, _target_start(mean, target, start))
+    return _result(weights, mean, cov, index, risk_free_rate)
+
+
+def max_sharpe_portfolio(mean_annual_returns, cov_matrix_annual, risk_free_rate=dfv.RISK_FREE_RATE):
+    # Changement de variable y = w / k : min y' C y sous (mu - rf)' y = 1, y >= 0, puis w = y / somme(y)
+    mean, cov, index = _as_arrays(mean_annual_returns, cov_matrix_annual)
+    excess = mean - risk_free_rate
+    if excess.max() <= 0:
+        # Aucun actif ne bat le taux sans risque : le portefeuille de variance minimale est retenu
+        return min_variance_portfolio(mean_annual_returns, cov_matrix_annual, risk_free_rate)
+    n = len(mean)
+    best = int(np.argmax(excess))
+    y0 = np.zeros(n)
+    y0[best] = 1.0 / excess[best]
+    y = _active_set_qp(cov, np.zeros(n), excess[None, :], np.ones(1), y0)
+    return _result(y / y.sum(), mean, cov, index, risk_free_rate)
+
+
+def efficient_frontier(mean_annual_returns, cov_matrix_annual, n_points=100, risk_free_rate=dfv.RISK_FREE_RATE):
+    # Frontière efficiente : du portefeuille de variance minimale jusqu'au rendement maximal.
+    # Chaque point repart des poids du point précédent.
+    mean, cov, index = _as_arrays(mean_annual_returns, cov_matrix_annual)
+    n = len(mean)
+
+    weights = _active_set_qp(cov, np.zeros(n), np.ones((1, n)), np.ones(1), np.full(n, 1 / n))
+    targets = np.linspace(weights @ mean, mean.max(), n_points)
+
+    A = np.vstack([np.ones(n), mean])
+    all_weights = np.empty((n_points, n))
+    all_weights[0] = weights
+    for i, target in enumerate(targets[1:], start=1):
+        b = np.array([1.0, target])
+        weights = _active_set_qp(cov, np.zeros(n), A, b, _target_start(mean, target, weights))
+        all_weights[i] = weights
+
+    stats = dfv.portfolio_statistics(all_weights, mean, cov, annual_factor=1, risk_free_rate=risk_free_rate)
+    frontier = pd.DataFrame({
+        "annual_return": stats["annual_return"],
+        "annual_volatility": stats["annual_volatility"],
+        "sharpe_ratio": stats["sharpe_ratio"],
+    })
+    return {
+        "frontier": frontier,
+        "weights": pd.DataFrame(all_weights, columns=index),
+    }
+
+
+@timing.timed("optimizer")
+def optimize_wallet(wallet_stats, n_points=100, risk_free_rate=dfv.RISK_FREE_RATE):
+    # Portefeuilles optimaux et frontière à partir des statistiques de dfv.get_wallet_statistics
+    mean = wallet_stats["mean_annual_returns"]
+    cov = wallet_stats["cov_matrix_annual"]
+    frontier = efficient_frontier(mean, cov, n_points, risk_free_rate)
+    # Le premier point de la frontière est le portefeuille de variance minimale
+    mean_values, cov_values, index = _as_arrays(mean, cov)
+    return {
+        "min_variance": _result(frontier["weights"].iloc[0].to_numpy(), mean_values, cov_values, index, risk_free_rate),
+        "max_sharpe": max_sharpe_portfolio(mean, cov, risk_free_rate),
+        **frontier,
+    }
@@ -0,0 +1,38 @@
+# Pool de processus partagé par les calculs lourds (Monte Carlo, backtests, rapports).
+#
+# Les processus ne sont pas créés par fork du processus courant : le serveur Streamlit a d'autres
+# threads (téléchargements, rendu des graphiques, flux en direct) qui peuvent détenir un verrou au
+# moment du fork, et un processus fils hériterait de ce verrou pris pour toujours. Le mode
+# "forkserver" part d'un processus serveur neuf, sans autre thread, qui a déjà importé numpy et
+# pandas : les processus du pool démarrent sans réimporter ces modules. Le mode "spawn" sert de
+# repli là où "forkserver" n'existe pas (Windows).
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+if "forkserver" in multiprocessing.get_all_start_methods():
+    _CONTEXT = multiprocessing.get_context("forkserver")
+    _CONTEXT.set_forkserver_preload(["numpy", "pandas"])
+else:
+    _CONTEXT = multiprocessing.get_context("spawn")
+
+
+def process_pool(max_workers, initializer=None, initargs=()):
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=_CONTEXT, initializer=initializer,
+                               initargs=initargs)
+
+
+def bounded_map(pool, function, tasks, max_pending):
+    # Résultats de `function(task)` dans l'ordre où les tâches se terminent, avec au plus
+    # `max_pending` tâches soumises en attente : les résultats sont consommés au fil de l'eau au lieu
+    # de s'accumuler en mémoire
+    pending = set()
+    for task in tasks:
+        if len(pending) >= max_pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+        pending.add(pool.submit(function, task))
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
@@ -0,0 +1,220 @@
+# Cache local des cours de clôture, indexé par ticker et par date.
+#
+# Chaque ticker est stocké dans un fichier Parquet (colonne "Close", index des dates) accompagné
+# d'un fichier JSON qui décrit la période déjà couverte et la date du dernier téléchargement.
+# Seules les périodes manquantes sont demandées au fournisseur de données.
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+import timing
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "FINANCE_VERTE_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "finance_verte", "prices")
+)
+DEFAULT_TTL = timedelta(hours=12)
+
+
+def _empty(ticker):
+    return pd.Series(dtype="float64", index=pd.DatetimeIndex([], name="Date"), name=ticker)
+
+
+def _as_list(tickers):
+    if isinstance(tickers, str):
+        return [tickers]
+    return list(tickers)
+
+
+# ------------------------------
+# Fournisseurs de données
+# ------------------------------
+# yf.download n'est pas réentrant : il remplace à chaque appel les dictionnaires globaux de résultats
+# (shared._DFS, shared._ERRORS) et la session du singleton YfData. Les appels sont donc sérialisés ;
+# le parallélisme par ticker reste assuré par les threads internes de yfinance.
+_YAHOO_LOCK = threading.Lock()
+
+
+class YahooProvider:
+    # Téléchargement des clôtures via yfinance (fin de période exclue, comme yf.download).
+    # Une session HTTP peut être fournie pour être réutilisée d'un appel à l'autre.
+    def __init__(self, session=None, threads=True):
+        self.session = session
+        self.threads = threads
+
+    def fetch(self, tickers, start, end):
+        import yfinance as yf
+
+        tickers = _as_list(tickers)
+        with _YAHOO_LOCK:
+            data = yf.download(tickers, start=start, end=end, progress=False, threads=self.threads,
+                               session=self.session)["Close"]
+        if isinstance(data, pd.Series):
+            data = data.to_frame(tickers[0])
+        return data
+
+
+class FrameProvider:
+    # Fournisseur en mémoire à partir d'un DataFrame large (une colonne par ticker).
+    # Garde la trace des requêtes reçues, ce qui permet de vérifier ce que le cache a demandé.
+    def __init__(self, prices):
+        self.prices = prices.sort_index()
+        self.requests = []
+
+    def fetch(self, tickers, start, end):
+        tickers = _as_list(tickers)
+        self.requests.append((tuple(tickers), pd.Timestamp(start), pd.Timestamp(end)))
+        window = self.prices.loc[(self.prices.index >= pd.Timestamp(start)) & (self.prices.index < pd.Timestamp(end))]
+        return window.reindex(columns=tickers)
+
+
+class LocalFixtureProvider(FrameProvider):
+    # Fournisseur hors ligne lisant un CSV large : une colonne "Date" puis une colonne par ticker
+    def __init__(self, path):
+        super().__init__(pd.read_csv(path, index_col="Date", parse_dates=True))
+
+
+# ------------------------------
+# Cache sur disque
+# ------------------------------
+class PriceStore:
+    def __init__(self, directory=DEFAULT_CACHE_DIR, provider=None, ttl=DEFAULT_TTL, offline=None):
+        self.directory = directory
+        if provider is None:
+            # Par défaut : téléchargement Yahoo concurrent, par lots, avec nouvelles tentatives
+            from fetcher import ConcurrentProvider
+
+            provider = ConcurrentProvider()
+        self.provider = provider
+        self.ttl = ttl
+        if offline is None:
+            offline = os.environ.get("FINANCE_VERTE_OFFLINE", "") not in ("", "0")
+        self.offline = offline
+        self.last_missing = []
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, ticker):
+        name = quote(ticker, safe="")
+        return os.path.join(self.directory, name + ".parquet"), os.path.join(self.directory, name + ".json")
+
+    def _read(self, ticker):
+        data_path, meta_path = self._paths(ticker)
+        if not os.path.exists(meta_path):
+            return _empty(ticker), None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        close = pd.read_parquet(data_path)["Close"].rename(ticker) if os.path.exists(data_path) else _empty(ticker)
+        return close, meta
+
+    def _write(self, ticker, close, meta):
+        with timing.stage("cache_write"):
+            self._write_files(ticker, close, meta)
+
+    def _write_files(self, ticker, close, meta):
+        data_path, meta_path = self._paths(ticker)
+        # Écriture dans un fichier temporaire puis remplacement atomique
+        close.rename("Close").to_frame().to_parquet(data_path + ".tmp")
+        os.replace(data_path + ".tmp", data_path)
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def missing_ranges(self, meta, start, end, now=None):
+        # Périodes [début, fin) à télécharger pour couvrir la demande
+        now = now or datetime.now()
+        if meta is None:
+            return [(start, end)]
+
+        covered_start = pd.Timestamp(meta["start"])
+        covered_end = pd.Timestamp(meta["end"])
+        fetched_at = pd.Timestamp(meta["fetched_at"])
+
+        ranges = []
+        # Les périodes téléchargées restent contiguës à la période couverte
+        if start < covered_start:
+            ranges.append((start, covered_start))
+        if end > covered_end:
+            # Le dernier jour couvert est le jour du téléchargement : sa clôture est provisoire
+            # et n'est rafraîchie qu'une fois le TTL écoulé.
+            fresh = pd.Timestamp(now) - fetched_at < self.ttl
+            if not (fresh and covered_end >= fetched_at.normalize()):
+                ranges.append((covered_end, end))
+        return ranges
+
+    def get_close(self, tickers, start, end, now=None):
+        tickers = _as_list(tickers)
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        now = now or datetime.now()
+
+        with self._lock:
+            with timing.stage("cache_read"):
+                cached = {ticker: self._read(ticker) for ticker in tickers}
+
+            if not self.offline:
+                # Regroupement des tickers ayant les mêmes périodes manquantes : un seul appel par groupe
+                groups = {}
+                for ticker, (_, meta) in cached.items():
+                    for rng in self.missing_ranges(meta, start, end, now):
+                        groups.setdefault(rng, []).append(ticker)
+
+                updates, missing = {}, set()
+                for (rng_start, rng_end), group in groups.items():
+                    with timing.stage("download"):
+                        fetched = self.provider.fetch(group, rng_start, rng_end)
+                    for ticker in group:
+                        # Un ticker absent ou entièrement vide sur des dates renvoyées est un échec :
+                        # la période n'est pas marquée comme couverte et sera redemandée.
+                        if ticker not in fetched or (len(fetched) and fetched[ticker].isna().all()):
+                            missing.add(ticker)
+                            continue
+                        updates.setdefault(ticker, []).append((rng_start, rng_end, fetched[ticker].dropna()))
+
+                # Tickers dont une période n'a pas pu être téléchargée (le reste du panel est conservé)
+                self.last_missing = [t for t in tickers if t in missing]
+                fetch_day = pd.Timestamp(now).normalize()
+                for ticker, parts in updates.items():
+                    close, meta = cached[ticker]
+                    frames = [close] + [s.rename(ticker) for _, _, s in parts if len(s)]
+                    merged = pd.concat(frames) if len(frames) > 1 else close
+                    # Les nouvelles valeurs remplacent les anciennes (dernier jour rafraîchi)
+                    merged = merged[~merged.index.duplicated(keep="last")].sort_index().astype("float64")
+                    merged.index.name = "Date"
+                    # La période couverte ne s'étend que des périodes effectivement téléchargées,
+                    # sans dépasser le jour du téléchargement
+                    bounds = [(pd.Timestamp(meta["start"]), pd.Timestamp(meta["end"]))] if meta else []
+                    bounds += [(rng_start, min(rng_end, fetch_day)) for rng_start, rng_end, _ in parts]
+                    covered_start = min(b[0] for b in bounds)
+                    covered_end = max(b[1] for b in bounds)
+                    # La date de téléchargement (utilisée par le TTL) ne change que si la fin a été rafraîchie
+                    refreshed = meta is None or any(rng_end > pd.Timestamp(meta["end"]) for _, rng_end, _ in parts)
+                    meta = {
+                        "start": covered_start.isoformat(),
+                        "end": covered_end.isoformat(),
+                        "fetched_at": pd.Timestamp(now).isoformat() if refreshed else meta["fetched_at"],
+                    }
+                    self._write(ticker, merged, meta)
+                    cached[ticker] = (merged, meta)
+
+        with timing.stage("align"):
+            columns = []
+            for ticker in tickers:
+                close = cached[ticker][0]
+                columns.append(close.loc[(close.index >= start) & (close.index < end)].rename(ticker))
+            panel = pd.concat(columns, axis=1).sort_index()
+            panel.index.name = "Date"
+            return panel.reindex(columns=tickers).astype(np.float64)
+
+    def clear(self, tickers=None):
+        with self._lock:
+            names = os.listdir(self.directory) if tickers is None else [
+                os.path.basename(p) for t in _as_list(tickers) for p in self._paths(t)
+            ]
+            for name in names:
+                path = os.path.join(self.directory, name)
+                if os.path.exists(path):
+                    os.remove(path)
@@ -0,0 +1,321 @@
+# Rapports en ligne de commande, sans Streamlit, pour les traitements planifiés (nuit, CI, ...).
+#
+# Pour chaque définition de portefeuille : statistiques annuelles (comme get_wallet_statistics),
+# température implicite et note MSCI pondérées, backtest face à l'indice de référence.
+# Le panel de cours de l'union des tickers est chargé une seule fois (dfv.load_prices) puis transmis
+# une fois à chaque processus du pool. Chaque portefeuille n'en lit que ses colonnes et ses rendements
+# sont calculés à part (dfv.MarketData) : ses résultats ne dépendent pas des autres portefeuilles du lot.
+# Les lignes de résultats sont écrites au fil de l'eau, dans l'ordre où les portefeuilles se
+# terminent : la mémoire ne croît pas avec le nombre de portefeuilles.
+#
+# Définitions (--portfolios) :
+# - JSON : liste d'objets {"name", "tickers", "weights" (optionnel, équipondéré par défaut)}, avec
+#   en option "schedule", "cost", "threshold" et "estimator" pour remplacer les valeurs par défaut ;
+# - CSV : colonnes name, ticker et weight (optionnelle), une ligne par position.
+# Sans --portfolios, le rapport porte sur le portefeuille retenu par screening.portfolio_tickers().
+#
+# Sortie : .parquet, .csv, .json (tableau JSON) ou .jsonl (un objet par ligne), selon l'extension
+# ou --format.
+#
+# Usage : python report.py [--portfolios portefeuilles.json] [--output rapport.parquet]
+#                          [--start 2019-01-01] [--end 2024-12-31] [--benchmark ^SPX]
+#                          [--schedule monthly] [--cost 0.001] [--estimator sample]
+#                          [--processes 4] [--timings]
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import backtest
+import covariance
+import data_finance_verte as dfv
+import esg
+import parallel
+import timing
+
+BENCHMARK_TICKER = "^SPX"
+FORMATS = ("parquet", "csv", "json", "jsonl")
+COLUMNS = [
+    ("name", "string"),
+    ("n_assets", "int"),
+    ("annual_return", "float"),
+    ("annual_volatility", "float"),
+    ("sharpe_ratio", "float"),
+    ("temperature", "float"),
+    ("msci_rating", "string"),
+    ("cagr", "float"),
+    ("max_drawdown", "float"),
+    ("n_rebalances", "int"),
+    ("annual_turnover", "float"),
+    ("total_costs", "float"),
+    ("benchmark_cagr", "float"),
+    ("excess_return", "float"),
+    ("tracking_error", "float"),
+    ("information_ratio", "float"),
+    ("error", "string"),
+]
+# Lignes accumulées avant l'écriture d'un groupe de lignes Parquet
+_PARQUET_BATCH = 256
+
+
+# ------------------------------
+# Définitions des portefeuilles
+# ------------------------------
+def load_portfolios(path):
+    if path.endswith(".csv"):
+        frame = pd.read_csv(path)
+        if "weight" not in frame:
+            frame["weight"] = np.nan
+        portfolios = []
+        for name, positions in frame.groupby("name", sort=False):
+            weights = None if positions["weight"].isna().all() else positions["weight"].tolist()
+            portfolios.append({"name": str(name), "tickers": positions["ticker"].tolist(), "weights": weights})
+        return portfolios
+    with open(path, encoding="utf-8") as f:
+        portfolios = json.load(f)
+    return portfolios["portfolios"] if isinstance(portfolios, dict) else portfolios
+
+
+def default_portfolios():
+    import screening
+
+    return [{"name": "selection_esg", "tickers": screening.portfolio_tickers()}]
+
+
+# ------------------------------
+# Calcul, dans les processus du pool
+# ------------------------------
+_worker = {}
+
+
+def _init_worker(prices, tickers, dates, benchmark_returns, esg_path, options):
+    _worker.update(prices=prices, columns={t: i for i, t in enumerate(tickers)}, dates=dates,
+                   benchmark_returns=benchmark_returns, esg=esg.load_esg(esg_path), options=options)
+
+
+def _analyse(portfolio):
+    options = {**_worker["options"], **{k: v for k, v in portfolio.items() if k in _worker["options"]}}
+    tickers = list(portfolio["tickers"])
+    weights = portfolio.get("weights")
+    weights = np.full(len(tickers), 1 / len(tickers)) if weights is None else np.asarray(weights, dtype=np.float64)
+    if len(weights) != len(tickers):
+        raise ValueError(f"{len(weights)} poids pour {len(tickers)} tickers")
+    weights = weights / weights.sum()
+    missing = [t for t in tickers if t not in _worker["columns"]]
+    if missing:
+        raise KeyError(f"Cours indisponibles pour : {', '.join(missing)}")
+
+    prices = pd.DataFrame(_worker["prices"][:, [_worker["columns"][t] for t in tickers]], index=_worker["dates"],
+                          columns=tickers)
+    # Seules les dates où l'un des actifs du portefeuille cote sont conservées
+    market = dfv.MarketData(prices.dropna(how="all"))
+    if len(market.dates) < 2:
+        raise ValueError("Historique commun insuffisant")
+    mean_daily_returns, cov_matrix_daily = market.moments()
+    if options["estimator"] != "sample":
+        cov_matrix_daily = market.covariance(options["estimator"])
+    stats = dfv.portfolio_statistics(weights, mean_daily_returns, cov_matrix_daily)
+
+    store = _worker["esg"]
+    known = np.array([t in store for t in tickers])
+    temperature = rating = math.nan
+    if known.any():
+        known_tickers = [t for t in tickers if t in store]
+        temperature = float(store.weighted_temperature(weights[known], known_tickers))
+        rating = float(store.weighted_rating(weights[known], known_tickers))
+
+    result = backtest.backtest(market.returns, weights,
+                               schedule=options["schedule"], cost=options["cost"], threshold=options["threshold"],
+                               benchmark=_worker["benchmark_returns"])
+    return {
+        **result["summary"],
+        "n_assets": len(tickers),
+        "n_rebalances": int(result["summary"]["n_rebalances"]),
+        "annual_return": float(stats["annual_return"][0]),
+        "annual_volatility": float(stats["annual_volatility"][0]),
+        "sharpe_ratio": float(stats["sharpe_ratio"][0]),
+        "temperature": temperature,
+        "msci_rating": None if math.isnan(rating) else esg.ESGStore.rating_label(rating),
+    }
+
+
+def _run_chunk(chunk):
+    # Une erreur sur un portefeuille (ticker inconnu, poids invalides, historique vide, ...)
+    # est inscrite dans sa ligne et n'interrompt pas le lot
+    rows = []
+    for portfolio in chunk:
+        try:
+            row = _analyse(portfolio)
+        except Exception as error:
+            row = {"error": str(error).strip("'\"") or type(error).__name__}
+        rows.append({name: row.get(name) for name, _ in COLUMNS} | {"name": str(portfolio["name"])})
+    return rows
+
+
+# ------------------------------
+# Écriture au fil de l'eau
+# ------------------------------
+class CsvWriter:
+    def __init__(self, path):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=[name for name, _ in COLUMNS])
+        self._writer.writeheader()
+
+    def write(self, row):
+        self._writer.writerow(row)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def _json_value(value):
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+class JsonWriter:
+    # Tableau JSON (`lines=False`) ou un objet par ligne (JSON Lines)
+    def __init__(self, path, lines=False):
+        self._file = open(path, "w", encoding="utf-8")
+        self._lines = lines
+        self._first = True
+        if not lines:
+            self._file.write("[")
+
+    def write(self, row):
+        text = json.dumps({key: _json_value(value) for key, value in row.items()}, ensure_ascii=False)
+        if self._lines:
+            self._file.write(text + "\n")
+        else:
+            self._file.write(("\n" if self._first else ",\n") + text)
+        self._first = False
+        self._file.flush()
+
+    def close(self):
+        if not self._lines:
+            self._file.write("\n]\n")
+        self._file.close()
+
+
+class ParquetWriter:
+    # Un groupe de lignes Parquet tous les _PARQUET_BATCH portefeuilles
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        types = {"string": pa.string(), "int": pa.int64(), "float": pa.float64()}
+        self._schema = pa.schema([(name, types[kind]) for name, kind in COLUMNS])
+        self._writer = pq.ParquetWriter(path, self._schema)
+        self._pa = pa
+        self._rows = []
+
+    def write(self, row):
+        self._rows.append(row)
+        if len(self._rows) >= _PARQUET_BATCH:
+            self._flush()
+
+    def _flush(self):
+        if self._rows:
+            self._writer.write_table(self._pa.Table.from_pylist(self._rows, schema=self._schema))
+            self._rows = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+def open_writer(path, fmt=None):
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt == "parquet":
+        return ParquetWriter(path)
+    if fmt == "csv":
+        return CsvWriter(path)
+    if fmt in ("json", "jsonl"):
+        return JsonWriter(path, lines=fmt == "jsonl")
+    raise ValueError(f"Format inconnu : {fmt!r} (attendu parmi {FORMATS})")
+
+
+# ------------------------------
+# Lot complet
+# ------------------------------
+@timing.timed("report")
+def run_report(portfolios, writer, start=dfv.start_date, end=dfv.end_date, benchmark=BENCHMARK_TICKER,
+               schedule="monthly", cost=0.001, threshold=0.05, estimator="sample", processes=None, chunk_size=8,
+               esg_path=esg.DEFAULT_ESG_PATH):
+    # Écrit une ligne par portefeuille avec `writer.write(row)` ; renvoie le nombre de portefeuilles en erreur
+    portfolios = list(portfolios)
+    universe = list(dict.fromkeys(t for p in portfolios for t in p["tickers"]))
+    if benchmark is not None and benchmark not in universe:
+        universe.append(benchmark)
+    # Les cours manquants sont téléchargés en parallèle, puis l'union forme un seul panel ; les tickers
+    # sans cours en sont écartés et les portefeuilles qui les contiennent sont signalés en erreur
+    dfv.prefetch_prices(universe, start, end)
+    prices = dfv.load_prices(universe, start, end).dropna(axis=1, how="all")
+    benchmark_returns = None
+    if benchmark is not None and benchmark in prices:
+        benchmark_returns = prices[benchmark].dropna().pct_change().dropna()
+
+    options = {"schedule": schedule, "cost": cost, "threshold": threshold, "estimator": estimator}
+    initargs = (prices.to_numpy(dtype=np.float64), list(prices.columns), prices.index, benchmark_returns, esg_path,
+                options)
+    chunks = [portfolios[i:i + chunk_size] for i in range(0, len(portfolios), chunk_size)]
+    processes = processes or os.cpu_count() or 1
+    errors = 0
+
+    def write(rows):
+        nonlocal errors
+        for row in rows:
+            writer.write(row)
+            errors += row["error"] is not None
+
+    if processes == 1 or len(chunks) == 1:
+        _init_worker(*initargs)
+        for chunk in chunks:
+            write(_run_chunk(chunk))
+    else:
+        # Au plus deux paquets en attente par processus, écrits dès qu'ils sont terminés
+        with parallel.process_pool(min(processes, len(chunks)), _init_worker, initargs) as pool:
+            for rows in parallel.bounded_map(pool, _run_chunk, chunks, 2 * processes):
+                write(rows)
+    return errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rapport de performances et de données ESG par portefeuille")
+    parser.add_argument("--portfolios", help="définitions des portefeuilles (.json ou .csv)")
+    parser.add_argument("--output", default="rapport.parquet")
+    parser.add_argument("--format", choices=FORMATS, help="par défaut, déduit de l'extension de --output")
+    parser.add_argument("--start", default=dfv.start_date)
+    parser.add_argument("--end", default=dfv.end_date)
+    parser.add_argument("--benchmark", default=BENCHMARK_TICKER)
+    parser.add_argument("--schedule", default="monthly", choices=backtest.SCHEDULES)
+    parser.add_argument("--cost", type=float, default=0.001, help="coûts de transaction (0.001 = 10 points de base)")
+    parser.add_argument("--threshold", type=float, default=0.05)
+    parser.add_argument("--estimator", default="sample", choices=covariance.ESTIMATORS)
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--chunk-size", type=int, default=8)
+    parser.add_argument("--timings", action="store_true", help="affiche le temps passé dans chaque étape")
+    args = parser.parse_args(argv)
+
+    portfolios = load_portfolios(args.portfolios) if args.portfolios else default_portfolios()
+    writer = open_writer(args.output, args.format)
+    with timing.StageTimer() as timer:
+        try:
+            errors = run_report(portfolios, writer, args.start, args.end, args.benchmark, args.schedule, args.cost,
+                                args.threshold, args.estimator, args.processes, args.chunk_size)
+        finally:
+            writer.close()
+
+    print(f"{len(portfolios)} portefeuilles, {errors} en erreur : {args.output}", file=sys.stderr)
+    if args.timings:
+        print(timer.report().to_string(), file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
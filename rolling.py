@@ -0,0 +1,192 @@
+# Indicateurs de risque glissants (fenêtre de 63 ou 252 jours) et cumulés depuis le début.
+#
+# - rolling_metrics : historique complet calculé par sommes cumulées ; chaque fenêtre est obtenue
+#   par différence de deux sommes, sans recalculer la fenêtre entière.
+# - RollingRisk : état incrémental (Welford avec ajout/retrait) pour suivre le portefeuille jour
+#   après jour ; l'ajout d'une journée coûte O(N²) quel que soit l'historique déjà vu.
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+import timing
+from data_finance_verte import ANNUAL_FACTOR, RISK_FREE_RATE
+
+
+def align_returns(returns, benchmark):
+    # Rendements de l'indice ramenés sur le calendrier du portefeuille, dont aucune date n'est retirée :
+    # un jour férié de l'indice a un rendement nul, et les séances où seul l'indice cote sont composées
+    # avec la séance suivante du portefeuille
+    if isinstance(benchmark, pd.DataFrame):
+        benchmark = benchmark.iloc[:, 0]
+    dates = returns.index.union(benchmark.index)
+    growth = np.concatenate([[1.0], np.cumprod(1 + benchmark.reindex(dates).fillna(0.0).to_numpy(dtype=np.float64))])
+    positions = dates.get_indexer(returns.index) + 1
+    previous = np.concatenate([positions[:1] - 1, positions[:-1]])
+    return returns, pd.Series(growth[positions] / growth[previous] - 1, index=returns.index, name=benchmark.name)
+
+
+def _window_sum(values, window):
+    # Somme glissante par différence de sommes cumulées : O(1) par date
+    cumulative = np.cumsum(values, axis=0)
+    result = cumulative.copy()
+    result[window:] -= cumulative[:-window]
+    result[:window - 1] = np.nan
+    return result
+
+
+@timing.timed("rolling")
+def rolling_metrics(returns, benchmark, weights=None, window=63, annual_factor=ANNUAL_FACTOR, risk_free_rate=RISK_FREE_RATE):
+    # Volatilité, Sharpe et bêta glissants du portefeuille, et drawdown depuis le plus haut historique
+    returns, benchmark = align_returns(returns, benchmark)
+    n_assets = returns.shape[1]
+    if weights is None:
+        weights = np.full(n_assets, 1 / n_assets)
+
+    p = returns.to_numpy(dtype=np.float64) @ np.asarray(weights, dtype=np.float64)
+    b = benchmark.to_numpy(dtype=np.float64)
+
+    sum_p, sum_b = _window_sum(p, window), _window_sum(b, window)
+    sum_pp, sum_bb, sum_pb = _window_sum(p * p, window), _window_sum(b * b, window), _window_sum(p * b, window)
+
+    var_p = (sum_pp - sum_p ** 2 / window) / (window - 1)
+    var_b = (sum_bb - sum_b ** 2 / window) / (window - 1)
+    cov_pb = (sum_pb - sum_p * sum_b / window) / (window - 1)
+
+    volatility = np.sqrt(np.clip(var_p, 0, None) * annual_factor)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe_ratio = (sum_p / window * annual_factor - risk_free_rate) / volatility
+        beta = cov_pb / var_b
+
+    wealth = np.cumprod(1 + p)
+    drawdown = wealth / np.maximum.accumulate(np.maximum(wealth, 1.0)) - 1
+
+    return pd.DataFrame({
+        "volatility": volatility,
+        "sharpe_ratio": sharpe_ratio,
+        "beta": beta,
+        "drawdown": drawdown,
+    }, index=returns.index)
+
+
+class _Moments:
+    # Moyenne et co-moments d'un vecteur, mis à jour par l'algorithme de Welford.
+    # Avec `window`, la plus ancienne observation est retirée à chaque ajout au-delà de la fenêtre.
+    def __init__(self, size, window=None):
+        self.window = window
+        self.count = 0
+        self.mean = np.zeros(size)
+        self.comoment = np.zeros((size, size))
+        self._buffer = deque() if window else None
+
+    def add(self, z):
+        self.count += 1
+        delta = z - self.mean
+        self.mean += delta / self.count
+        self.comoment += np.outer(delta, z - self.mean)
+        if self._buffer is not None:
+            self._buffer.append(z)
+            if len(self._buffer) > self.window:
+                self._remove(self._buffer.popleft())
+
+    def _remove(self, z):
+        self.count -= 1
+        delta = z - self.mean
+        self.mean -= delta / self.count
+        self.comoment -= np.outer(delta, z - self.mean)
+
+    def covariance(self):
+        if self.count < 2:
+            return np.full_like(self.comoment, np.nan)
+        return self.comoment / (self.count - 1)
+
+
+class RollingRisk:
+    # Suivi incrémental des indicateurs de risque d'un portefeuille à poids fixes.
+    # Le vecteur suivi est [rendements des actifs..., rendement du portefeuille, rendement de l'indice].
+    def __init__(self, tickers, weights=None, windows=(63, 252), annual_factor=ANNUAL_FACTOR, risk_free_rate=RISK_FREE_RATE):
+        self.tickers = list(tickers)
+        n_assets = len(self.tickers)
+        self.weights = np.full(n_assets, 1 / n_assets) if weights is None else np.asarray(weights, dtype=np.float64)
+        self.annual_factor = annual_factor
+        self.risk_free_rate = risk_free_rate
+        self.windows = tuple(windows)
+        self._rolling = {window: _Moments(n_assets + 2, window) for window in self.windows}
+        self._expanding = _Moments(n_assets + 2)
+        self.wealth = 1.0
+        self.peak = 1.0
+        self.max_drawdown = 0.0
+        self.last_date = None
+
+    @classmethod
+    def from_history(cls, returns, benchmark, weights=None, windows=(63, 252), **kwargs):
+        returns, benchmark = align_returns(returns, benchmark)
+        risk = cls(returns.columns, weights, windows, **kwargs)
+        X = returns.to_numpy(dtype=np.float64)
+        p = X @ risk.weights
+        Z = np.column_stack([X, p, benchmark.to_numpy(dtype=np.float64)])
+
+        # État cumulé initialisé en une fois à partir de tout l'historique
+        if len(Z):
+            expanding = risk._expanding
+            expanding.count = len(Z)
+            expanding.mean = Z.mean(axis=0)
+            centered = Z - expanding.mean
+            expanding.comoment = centered.T @ centered
+            wealth = np.cumprod(1 + p)
+            peaks = np.maximum.accumulate(np.maximum(wealth, 1.0))
+            risk.wealth = wealth[-1]
+            risk.peak = peaks[-1]
+            risk.max_drawdown = min(0.0, (wealth / peaks - 1).min())
+            risk.last_date = returns.index[-1]
+
+        # Les fenêtres glissantes ne reçoivent que leurs dernières observations
+        for window, moments in risk._rolling.items():
+            for z in Z[-window:]:
+                moments.add(z)
+        return risk
+
+    def update(self, asset_returns, benchmark_return, date=None):
+        # Ajout d'une journée : rendements des actifs (dans l'ordre de `tickers`) et de l'indice
+        x = np.asarray(asset_returns, dtype=np.float64)
+        p = float(x @ self.weights)
+        z = np.concatenate([x, [p, float(benchmark_return)]])
+        for moments in self._rolling.values():
+            moments.add(z)
+        self._expanding.add(z)
+
+        self.wealth *= 1 + p
+        self.peak = max(self.peak, self.wealth)
+        self.max_drawdown = min(self.max_drawdown, self.wealth / self.peak - 1)
+        self.last_date = date
+        return self.metrics()
+
+    def _portfolio_metrics(self, moments):
+        n_assets = len(self.tickers)
+        p, b = n_assets, n_assets + 1
+        cov = moments.covariance()
+        volatility = np.sqrt(cov[p, p] * self.annual_factor)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sharpe_ratio = (moments.mean[p] * self.annual_factor - self.risk_free_rate) / volatility
+            beta = cov[p, b] / cov[b, b]
+        asset_cov = cov[:n_assets, :n_assets]
+        std = np.sqrt(np.maximum(np.diag(asset_cov), 0))  # arrondis des variances quasi nulles (OAT, SCPI)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = asset_cov / np.outer(std, std)
+        return {
+            "volatility": volatility,
+            "sharpe_ratio": sharpe_ratio,
+            "beta": beta,
+            "covariance_matrix": pd.DataFrame(asset_cov * self.annual_factor, index=self.tickers, columns=self.tickers),
+            "correlation_matrix": pd.DataFrame(corr, index=self.tickers, columns=self.tickers),
+        }
+
+    def metrics(self):
+        return {
+            "date": self.last_date,
+            "rolling": {window: self._portfolio_metrics(moments) for window, moments in self._rolling.items()},
+            "expanding": self._portfolio_metrics(self._expanding),
+            "cumulative_return": self.wealth - 1,
+            "drawdown": self.wealth / self.peak - 1,
+            "max_drawdown": self.max_drawdown,
+        }
@@ -0,0 +1,133 @@
+# Moteur de sélection ESG : les critères de la page « Nos critères de sélection » sous forme de
+# masques booléens vectorisés sur le tableau structuré de esg.ESGStore.
+#
+# Chaque règle s'applique à une classe d'actifs et renvoie, pour tous les émetteurs à la fois, ceux
+# qui la respectent. Les échecs sont conservés dans une matrice émetteurs x règles, ce qui permet
+# d'expliquer chaque exclusion et de ne réévaluer que les émetteurs dont les données ont changé.
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+import data_finance_verte as dfv
+import esg
+
+Rule = namedtuple("Rule", ["name", "asset_class", "reason", "passes"])
+
+_AA = esg.MSCI_RATINGS.index("AA")
+_G = esg.CONTROVERSY_FLAGS.index("G")
+_O = esg.CONTROVERSY_FLAGS.index("O")
+
+
+def _rating_at_least_aa(r):
+    return r["msci_rating"] >= _AA
+
+
+def _controversies_not_worse_than_o(r):
+    controversy = r["controversy"]
+    return ((controversy >= 0) & (controversy <= _O)).all(axis=1)
+
+
+def _at_least_one_green(r):
+    return (r["controversy"] == _G).any(axis=1)
+
+
+def _no_controversial_sector(r):
+    # Tabac et alcool tolérés uniquement avec une note d'au moins AA ; les autres secteurs sont exclus
+    tobacco_or_alcohol = r["tobacco"] | r["alcohol"]
+    return ~r["controversial_other"] & (~tobacco_or_alcohol | (r["msci_rating"] >= _AA))
+
+
+DEFAULT_RULES = (
+    Rule("msci_rating", "equity", "note ESG MSCI inférieure à AA", _rating_at_least_aa),
+    Rule("controversy_level", "equity", "controverse plus grave que O sur un pilier (ou non notée)", _controversies_not_worse_than_o),
+    Rule("controversy_green", "equity", "aucun pilier de controverse noté G", _at_least_one_green),
+    Rule("controversial_sector", "equity", "implication dans un secteur controversé", _no_controversial_sector),
+    Rule("decarbonization_target", "equity", "aucun objectif de décarbonation", lambda r: r["decarbonization_year"] > 0),
+    Rule("sfdr_article_9", "fund", "fonds non classé article 9 SFDR", lambda r: r["sfdr_article"] == 9),
+    Rule("greenfin", "bond", "obligation sans label Greenfin", lambda r: r["greenfin"]),
+    Rule("isr", "scpi", "SCPI sans label ISR", lambda r: r["isr"]),
+)
+
+# Classes d'actifs cotées, dont les cours viennent du fournisseur de marché
+LISTED_ASSET_CLASSES = ("equity", "fund")
+
+
+class ScreeningEngine:
+    def __init__(self, store, rules=DEFAULT_RULES):
+        self.store = store
+        self.rules = tuple(rules)
+        self._rule_classes = np.array([esg.ASSET_CLASSES.index(rule.asset_class) for rule in self.rules])
+        self.failures = self._evaluate(store.records)
+
+    def _evaluate(self, records):
+        # Matrice (émetteurs x règles) : True si la règle s'applique à l'émetteur et n'est pas respectée
+        failures = np.zeros((len(records), len(self.rules)), dtype=bool)
+        for j, rule in enumerate(self.rules):
+            applies = records["asset_class"] == self._rule_classes[j]
+            failures[:, j] = applies & ~np.asarray(rule.passes(records), dtype=bool)
+        return failures
+
+    @property
+    def unknown_class(self):
+        return self.store.records["asset_class"] < 0
+
+    @property
+    def selected_mask(self):
+        return ~self.failures.any(axis=1) & ~self.unknown_class
+
+    def selected(self, asset_classes=None):
+        mask = self.selected_mask
+        if asset_classes is not None:
+            codes = [esg.ASSET_CLASSES.index(c) for c in asset_classes]
+            mask &= np.isin(self.store.records["asset_class"], codes)
+        return list(self.store.tickers[mask])
+
+    def update(self, frame):
+        # Mise à jour incrémentale : `frame` contient les lignes modifiées ou nouvelles (colonnes de
+        # data/esg.csv). Seuls ces émetteurs sont réévalués. Le store d'origine, souvent partagé
+        # (esg.load_esg est mis en cache), n'est pas modifié : l'engine passe sur une copie.
+        changes = esg.ESGStore.from_frame(frame)
+        positions = self.store.tickers.get_indexer(changes.tickers)
+        known = positions >= 0
+
+        tickers, records, text = self.store.tickers, self.store.records.copy(), self.store.text.copy()
+        records[positions[known]] = changes.records[known]
+        text.iloc[positions[known]] = changes.text.iloc[np.flatnonzero(known)].to_numpy()
+        self.failures[positions[known]] = self._evaluate(changes.records[known])
+
+        if (~known).any():
+            new = np.flatnonzero(~known)
+            tickers = tickers.append(changes.tickers[new])
+            records = np.concatenate([records, changes.records[new]])
+            text = pd.concat([text, changes.text.iloc[new]])
+            self.failures = np.vstack([self.failures, self._evaluate(changes.records[new])])
+        self.store = esg.ESGStore(tickers, records, text)
+        return self
+
+    def report(self):
+        # Tableau par émetteur : sélectionné ou non, et motifs d'exclusion séparés par « ; »
+        reasons = np.full(len(self.store), "", dtype=object)
+        for j, rule in enumerate(self.rules):
+            failed = self.failures[:, j]
+            reasons[failed] = reasons[failed] + rule.reason + "; "
+        reasons[self.unknown_class] = reasons[self.unknown_class] + "classe d'actif inconnue; "
+        classes = np.array(esg.ASSET_CLASSES + ("inconnue",))[self.store.records["asset_class"]]
+        return pd.DataFrame({
+            "asset_class": classes,
+            "selected": self.selected_mask,
+            "reasons": pd.Series(reasons).str.rstrip("; ").to_numpy(),
+        }, index=self.store.tickers)
+
+
+def screen(store=None, rules=DEFAULT_RULES):
+    return ScreeningEngine(store if store is not None else esg.load_esg(), rules)
+
+
+def portfolio_tickers(engine=None):
+    # Tickers retenus par les critères de sélection, à passer à dfv.get_wallet_statistics : actifs
+    # cotés, et actifs non cotés dont les rendements sont fournis par une source (dfv.get_asset_sources)
+    engine = engine if engine is not None else screen()
+    listed = set(engine.selected(LISTED_ASSET_CLASSES))
+    return [t for t in engine.selected()
+            if t in listed or any(source.covers(t) for source in dfv.get_asset_sources())]
@@ -0,0 +1,98 @@
+# Cache mémoire des statistiques utilisées par les pages de app.py.
+#
+# Les résultats sont indexés par (fonction, tickers, début, fin, poids) et évincés selon
+# l'ordre LRU au-delà de `maxsize` entrées. Le cache compte les succès, les échecs et le
+# temps passé à calculer, pour le panneau de diagnostic de l'application.
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import data_finance_verte as dfv
+
+
+def _materialize(stats):
+    # Les statistiques paresseuses sont matérialisées pour que le temps mesuré soit le vrai coût ;
+    # la forme compacte de la covariance, que les pages n'utilisent pas, reste à la demande
+    return {key: stats[key] for key in stats if key != "covariance_model"}
+
+
+def make_key(kind, tickers, start, end, weights=None):
+    if isinstance(tickers, str):
+        tickers = [tickers]
+    if weights is not None:
+        weights = tuple(float(w) for w in np.round(np.asarray(weights, dtype=np.float64), 12))
+    return (kind, tuple(tickers), str(start), str(end), weights)
+
+
+class StatsCache:
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.compute_seconds = 0.0
+        self.last_compute_seconds = 0.0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Calcul hors du verrou : les autres sessions continuent d'être servies
+        begin = time.perf_counter()
+        value = compute()
+        elapsed = time.perf_counter() - begin
+
+        with self._lock:
+            self.compute_seconds += elapsed
+            self.last_compute_seconds = elapsed
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def wallet_statistics(self, tickers, start=dfv.start_date, end=dfv.end_date, weights=None, estimator="sample"):
+        key = make_key("wallet" if estimator == "sample" else f"wallet_{estimator}", tickers, start, end, weights)
+        return self.get_or_compute(key, lambda: _materialize(dfv.get_wallet_statistics(tickers, start, end, weights=weights,
+                                                                                       estimator=estimator)))
+
+    def stock_statistics(self, tickers, start=dfv.start_date, end=dfv.end_date):
+        key = make_key("stock", tickers, start, end)
+        return self.get_or_compute(key, lambda: _materialize(dfv.get_stock_statistics(tickers, start, end)))
+
+    def invalidate(self, tickers=None):
+        # Sans argument : vide tout le cache. Sinon, supprime les entrées contenant l'un des tickers.
+        with self._lock:
+            if tickers is None:
+                self._entries.clear()
+                dfv.clear_market_data_cache()
+                return
+            tickers = {tickers} if isinstance(tickers, str) else set(tickers)
+            for key in [k for k in self._entries if tickers & set(k[1])]:
+                del self._entries[key]
+            # Les MarketData mémorisés contenant ces tickers seraient sinon réutilisés tels quels
+            dfv.clear_market_data_cache()
+
+    def diagnostics(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "compute_seconds": self.compute_seconds,
+                "last_compute_seconds": self.last_compute_seconds,
+            }
@@ -0,0 +1,217 @@
+# Suivi du portefeuille en flux : barres journalières et cours intrajournaliers.
+#
+# PortfolioStream part de l'historique déjà chargé puis met à jour, événement par événement,
+# les rendements, la performance cumulée et les indicateurs de risque (rolling.RollingRisk),
+# sans jamais recalculer tout l'historique. Les événements proviennent d'un itérable
+# (générateur, ReplayFeed, PollingFeed) ou d'une asyncio.Queue.
+import asyncio
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import data_finance_verte as dfv
+from rolling import RollingRisk, align_returns
+
+# Clôture d'une journée complète : `closes` associe chaque ticker à son cours
+Bar = namedtuple("Bar", ["date", "closes", "benchmark"])
+# Cours intrajournalier provisoire d'un ticker (le ticker de l'indice est accepté)
+Tick = namedtuple("Tick", ["timestamp", "ticker", "price"])
+
+
+class PortfolioStream:
+    def __init__(self, prices, benchmark_prices, weights=None, windows=(63, 252), benchmark_ticker="^SPX"):
+        if isinstance(benchmark_prices, pd.DataFrame):
+            benchmark_prices = benchmark_prices.iloc[:, 0]
+        market = dfv.MarketData(prices)
+        # L'indice est ramené sur le calendrier du portefeuille (jours fériés américains : rendement nul)
+        benchmark_prices = benchmark_prices.reindex(prices.index.union(benchmark_prices.index)).ffill().reindex(prices.index)
+        returns, benchmark_returns = align_returns(market.returns, benchmark_prices.pct_change().dropna())
+
+        self.tickers = market.tickers
+        self.benchmark_ticker = benchmark_ticker
+        self.risk = RollingRisk.from_history(returns, benchmark_returns, weights, windows)
+        self.weights = self.risk.weights
+
+        self.last_close = prices[self.tickers].ffill().iloc[-1].to_numpy(dtype=np.float64)
+        self.last_benchmark = float(benchmark_prices.ffill().iloc[-1])
+        self.last_date = prices.index[-1]
+        self.live_prices = {}
+
+        # Performance cumulée (portfolio_cumulative_returns) : historique puis ajouts en fin de liste
+        wealth = np.cumprod(1 + returns.to_numpy() @ self.weights)
+        self._dates = list(returns.index)
+        self._wealth = list(wealth)
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        # `callback(update)` est appelé après chaque événement traité
+        self._subscribers.append(callback)
+
+    def _publish(self, update):
+        for callback in self._subscribers:
+            callback(update)
+        return update
+
+    @property
+    def portfolio_cumulative_returns(self):
+        return pd.Series(self._wealth, index=pd.DatetimeIndex(self._dates), name="Portefeuille")
+
+    def recent_cumulative_returns(self, n):
+        # Dernières valeurs seulement, pour les graphiques rafraîchis à chaque barre
+        return pd.Series(self._wealth[-n:], index=pd.DatetimeIndex(self._dates[-n:]), name="Portefeuille")
+
+    def on_bar(self, bar):
+        date = pd.Timestamp(bar.date)
+        if date <= self.last_date:
+            # Barre déjà intégrée (rejeu ou doublon du fournisseur)
+            return None
+
+        closes = np.array([bar.closes.get(t, np.nan) for t in self.tickers], dtype=np.float64)
+        closes = np.where(np.isnan(closes), self.last_close, closes)
+        benchmark = self.last_benchmark if bar.benchmark is None or np.isnan(bar.benchmark) else float(bar.benchmark)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            asset_returns = closes / self.last_close - 1
+        asset_returns[~np.isfinite(asset_returns)] = 0  # Remplacement des valeurs infinies par 0
+        benchmark_return = benchmark / self.last_benchmark - 1
+
+        metrics = self.risk.update(asset_returns, benchmark_return, date)
+
+        self.last_close = closes
+        self.last_benchmark = benchmark
+        self.last_date = date
+        self.live_prices = {}
+        self._dates.append(date)
+        self._wealth.append(self.risk.wealth)
+
+        return self._publish({
+            "type": "bar",
+            "date": date,
+            "asset_returns": pd.Series(asset_returns, index=self.tickers),
+            "portfolio_return": float(asset_returns @ self.weights),
+            "benchmark_return": benchmark_return,
+            "cumulative_value": self.risk.wealth,
+            "metrics": metrics,
+        })
+
+    def on_tick(self, tick):
+        # Cours provisoire : performance intrajournalière estimée, sans modifier l'état de risque
+        self.live_prices[tick.ticker] = float(tick.price)
+        live = np.array([self.live_prices.get(t, c) for t, c in zip(self.tickers, self.last_close)])
+        portfolio_return = float((live / self.last_close - 1) @ self.weights)
+        benchmark = self.live_prices.get(self.benchmark_ticker, self.last_benchmark)
+        return self._publish({
+            "type": "tick",
+            "date": pd.Timestamp(tick.timestamp),
+            "portfolio_return": portfolio_return,
+            "benchmark_return": benchmark / self.last_benchmark - 1,
+            "cumulative_value": self.risk.wealth * (1 + portfolio_return),
+        })
+
+    def process(self, event):
+        return self.on_bar(event) if isinstance(event, Bar) else self.on_tick(event)
+
+    def run(self, feed):
+        # Traitement d'un flux synchrone ; les barres déjà connues sont ignorées
+        for event in feed:
+            update = self.process(event)
+            if update is not None:
+                yield update
+
+    async def run_async(self, queue):
+        # Traitement d'une asyncio.Queue jusqu'à la réception de None
+        updates = []
+        while True:
+            event = await queue.get()
+            if event is None:
+                break
+            update = self.process(event)
+            if update is not None:
+                updates.append(update)
+        return updates
+
+
+# ------------------------------
+# Sources d'événements
+# ------------------------------
+class ReplayFeed:
+    # Rejoue des cours historiques barre par barre, avec un délai optionnel entre deux barres
+    def __init__(self, prices, benchmark_prices, delay=0.0):
+        if isinstance(benchmark_prices, pd.DataFrame):
+            benchmark_prices = benchmark_prices.iloc[:, 0]
+        self.prices = prices
+        self.benchmark_prices = benchmark_prices.reindex(prices.index.union(benchmark_prices.index)).ffill().reindex(prices.index)
+        self.delay = delay
+
+    def _bars(self):
+        for date, row in self.prices.iterrows():
+            yield Bar(date, row.dropna().to_dict(), self.benchmark_prices.get(date, np.nan))
+
+    def __iter__(self):
+        for bar in self._bars():
+            yield bar
+            if self.delay:
+                time.sleep(self.delay)
+
+    async def __aiter__(self):
+        for bar in self._bars():
+            yield bar
+            if self.delay:
+                await asyncio.sleep(self.delay)
+
+    async def to_queue(self, queue):
+        async for bar in self:
+            await queue.put(bar)
+        await queue.put(None)
+
+
+class PollingFeed:
+    # Interroge régulièrement le fournisseur de cours. Les journées terminées sont émises comme
+    # barres ; les variations de la journée en cours sont émises comme cours provisoires.
+    # Les tickers non interrogés gardent leur dernier cours (PortfolioStream.on_bar).
+    # `start` : dernière séance déjà connue du flux (PortfolioStream.last_date). Les interrogations
+    # repartent de la dernière barre émise, pour qu'aucune séance ne soit sautée ni agrégée.
+    def __init__(self, provider, tickers, benchmark_ticker="^SPX", interval=60.0, lookback_days=7, max_polls=None,
+                 start=None):
+        self.provider = provider
+        self.tickers = list(tickers)
+        self.benchmark_ticker = benchmark_ticker
+        self.interval = interval
+        self.lookback_days = lookback_days
+        self.max_polls = max_polls
+        self.start = start
+
+    def __iter__(self):
+        emitted_dates = set()
+        last_prices = {}
+        polls = 0
+        last_bar = None if self.start is None else pd.Timestamp(self.start)
+        while self.max_polls is None or polls < self.max_polls:
+            now = datetime.now()
+            since = now - timedelta(days=self.lookback_days)
+            if last_bar is not None:
+                since = min(since, last_bar.to_pydatetime())
+            prices = self.provider.fetch(self.tickers + [self.benchmark_ticker], since, now + timedelta(days=1))
+            prices = prices.dropna(how="all").ffill()
+            if len(prices):
+                # Toutes les lignes sauf la dernière correspondent à des séances terminées
+                for date, row in prices.iloc[:-1].iterrows():
+                    if date not in emitted_dates and (last_bar is None or date > last_bar):
+                        benchmark = row.get(self.benchmark_ticker, np.nan)
+                        if np.isnan(benchmark):
+                            # Indice absent de la réponse : la séance (et les suivantes) sera redemandée
+                            break
+                        emitted_dates.add(date)
+                        last_bar = date
+                        yield Bar(date, row.drop(self.benchmark_ticker).dropna().to_dict(), benchmark)
+                current_date = prices.index[-1]
+                for ticker, price in prices.iloc[-1].dropna().items():
+                    if last_prices.get(ticker) != price:
+                        last_prices[ticker] = price
+                        yield Tick(current_date, ticker, price)
+            polls += 1
+            if self.max_polls is None or polls < self.max_polls:
+                time.sleep(self.interval)
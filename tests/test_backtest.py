@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+import backtest
+import rolling
+
+
+def _returns_with_benchmark_holidays(n_days=1500, n_holidays=75, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2019-01-01", periods=n_days, name="Date")
+    returns = pd.DataFrame(rng.normal(0.0004, 0.01, (n_days, 3)), index=dates, columns=["A", "B", "C"])
+    benchmark = pd.Series(rng.normal(0.0003, 0.01, n_days), index=dates, name="^SPX")
+    holidays = rng.choice(np.arange(1, n_days), n_holidays, replace=False)
+    return returns, benchmark.drop(dates[holidays])
+
+
+def test_benchmark_holidays_keep_every_portfolio_day():
+    returns, benchmark = _returns_with_benchmark_holidays()
+    result = backtest.backtest(returns, benchmark=benchmark, schedule="monthly", cost=0.001)
+    alone = backtest.backtest(returns, schedule="monthly", cost=0.001)
+
+    assert len(result["value"]) == len(returns)
+    np.testing.assert_allclose(result["value"].to_numpy(), alone["value"].to_numpy())
+    # L'indice garde sa performance totale : ses jours fériés ont un rendement nul
+    assert np.isclose(result["benchmark_value"].iloc[-1], np.prod(1 + benchmark.to_numpy()))
+
+
+def test_benchmark_only_sessions_are_compounded_into_next_portfolio_day():
+    dates = pd.to_datetime(["2024-01-02", "2024-01-03", "2024-01-05"])
+    returns = pd.DataFrame({"A": [0.01, 0.02, 0.03]}, index=dates)
+    benchmark = pd.Series([0.01, 0.10, 0.10], index=pd.to_datetime(["2024-01-02", "2024-01-04", "2024-01-05"]))
+
+    aligned_returns, aligned = rolling.align_returns(returns, benchmark)
+
+    assert aligned_returns.index.equals(dates)
+    np.testing.assert_allclose(aligned.to_numpy(), [0.01, 0.0, 1.1 * 1.1 - 1])
+
+
+def test_rolling_metrics_keep_benchmark_holidays():
+    returns, benchmark = _returns_with_benchmark_holidays()
+    risk = rolling.rolling_metrics(returns, benchmark, window=63)
+    assert len(risk) == len(returns)
@@ -0,0 +1,213 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from fetcher import ConcurrentProvider
+from price_store import FrameProvider, PriceStore
+
+NAMES = [f"T{i:02d}" for i in range(20)]
+START, END = "2024-01-01", "2024-03-01"
+
+
+def _prices(names=NAMES):
+    index = pd.bdate_range("2023-12-01", "2024-03-29", name="Date")
+    values = np.random.default_rng(0).lognormal(0, 0.01, (len(index), len(names))).cumprod(axis=0)
+    return pd.DataFrame(values, index=index, columns=names)
+
+
+class FakeProvider(FrameProvider):
+    # Fournisseur local : latence injectée (éventuellement par lot), premiers appels en erreur
+    # pour chaque lot, et tickers définitivement absents
+    def __init__(self, prices, calls, latency=0.0, failures=0, unknown=(), error=RuntimeError("429 Too Many Requests")):
+        super().__init__(prices)
+        self.calls = calls
+        self.latency = latency
+        self.failures = failures
+        self.unknown = set(unknown)
+        self.error = error
+
+    def fetch(self, tickers, start, end):
+        key = tuple(tickers)
+        with self.calls["lock"]:
+            self.calls[key] = self.calls.get(key, 0) + 1
+            attempt = self.calls[key]
+        time.sleep(self.latency(key) if callable(self.latency) else self.latency)
+        if attempt <= self.failures:
+            raise self.error
+        return super().fetch([t for t in tickers if t not in self.unknown], start, end)
+
+
+def _source(prices, **options):
+    calls = {"lock": threading.Lock()}
+    return calls, lambda: FakeProvider(prices, calls, **options)
+
+
+def test_errors_are_retried_with_exponential_backoff():
+    prices = _prices()
+    calls, source = _source(prices, failures=3)
+    delays = []
+    fetcher = ConcurrentProvider(sources=[source], batch_size=len(NAMES), max_workers=1, retries=3,
+                                 backoff=0.5, max_backoff=1.5, sleep=delays.append)
+
+    result = fetcher.fetch_report(NAMES, START, END)
+
+    assert calls[tuple(NAMES)] == 4
+    assert result.missing == [] and result.errors == {}
+    assert list(result.prices.columns) == NAMES
+    # Délai 0,5 * 2^k plafonné à 1,5, avec une gigue entre 50 % et 100 %
+    for delay, base in zip(delays, [0.5, 1.0, 1.5]):
+        assert base / 2 <= delay <= base
+    assert len(delays) == 3
+    fetcher.close()
+
+
+def test_retries_are_bounded_and_errors_reported():
+    prices = _prices()
+    calls, source = _source(prices, failures=10)
+    delays = []
+    fetcher = ConcurrentProvider(sources=[source], batch_size=5, max_workers=2, retries=2, sleep=delays.append)
+
+    prices = fetcher.fetch(NAMES, START, END)
+
+    assert all(calls[tuple(NAMES[i:i + 5])] == 3 for i in range(0, len(NAMES), 5))
+    assert len(delays) == 2 * 4
+    assert prices.empty and list(prices.columns) == []
+    assert fetcher.last_missing == NAMES
+    assert set(fetcher.last_errors) == set(NAMES)
+    assert "429" in fetcher.last_errors["T00"]
+    fetcher.close()
+
+
+def test_partial_failure_keeps_the_rest_of_the_panel():
+    prices = _prices()
+    unknown = ["T03", "T11"]
+    calls, source = _source(prices, unknown=unknown)
+    fetcher = ConcurrentProvider(sources=[source], batch_size=4, max_workers=4, retries=1, sleep=lambda delay: None)
+
+    result = fetcher.fetch_report(NAMES, START, END)
+
+    assert result.missing == unknown
+    assert result.errors == {}
+    window = (prices.index >= START) & (prices.index < END)
+    pd.testing.assert_frame_equal(result.prices, prices.loc[window, [t for t in NAMES if t not in unknown]],
+                                  check_freq=False)
+    # Chaque lot est demandé une fois ; seuls les tickers absents sont redemandés
+    assert all(calls[tuple(NAMES[i:i + 4])] == 1 for i in range(0, len(NAMES), 4))
+    assert calls[("T03",)] == 1 and calls[("T11",)] == 1
+    assert len(calls) == 1 + 5 + 2
+    fetcher.close()
+
+
+def test_missing_tickers_fall_back_to_the_next_source():
+    prices = _prices()
+    _, first = _source(prices, unknown=["T05", "T06"])
+    second_calls, second = _source(prices, unknown=["T06"])
+    fetcher = ConcurrentProvider(sources=[first, second], batch_size=4, retries=0, sleep=lambda delay: None)
+
+    result = fetcher.fetch_report(NAMES, START, END)
+
+    assert result.missing == ["T06"]
+    assert list(result.prices.columns) == [t for t in NAMES if t != "T06"]
+    assert result.prices["T05"].notna().all()
+    assert [key for key in second_calls if key != "lock"] == [("T05", "T06")]
+    fetcher.close()
+
+
+def test_columns_follow_the_requested_order():
+    prices = _prices()
+    order = NAMES[::-1]
+    # Les premiers lots répondent le plus lentement : ils se terminent en dernier
+    _, source = _source(prices, latency=lambda key: 0.02 * (len(NAMES) - order.index(key[0])) / len(NAMES))
+    fetcher = ConcurrentProvider(sources=[source], batch_size=3, max_workers=8, sleep=lambda delay: None)
+
+    result = fetcher.fetch_report(order, START, END)
+
+    assert list(result.prices.columns) == order
+    assert result.prices.index.is_monotonic_increasing
+    fetcher.close()
+
+
+def test_concurrent_batches_overlap():
+    prices = _prices()
+    latency, batches = 0.1, 8
+    _, source = _source(prices, latency=latency)
+    fetcher = ConcurrentProvider(sources=[source], batch_size=len(NAMES) // batches + 1, max_workers=batches,
+                                 sleep=lambda delay: None)
+    fetcher.fetch(NAMES[:1], START, END)  # création du pool et des fournisseurs hors mesure
+
+    begin = time.perf_counter()
+    result = fetcher.fetch_report(NAMES, START, END)
+    elapsed = time.perf_counter() - begin
+
+    n_batches = -(-len(NAMES) // fetcher.batch_size)
+    assert result.missing == []
+    # Séquentiel : n_batches * latency ; avec un thread par lot, à peine plus d'une latence
+    assert latency <= elapsed < n_batches * latency / 2
+    fetcher.close()
+
+
+def test_empty_window_is_covered_without_retry(tmp_path):
+    # Week-end, puis période antérieure au début de l'historique : aucune séance, aucun échec
+    prices = _prices()
+    calls, source = _source(prices)
+    delays = []
+    fetcher = ConcurrentProvider(sources=[source], batch_size=2, sleep=delays.append)
+    store = PriceStore(str(tmp_path), fetcher, offline=False)
+
+    for start, end in [("2024-01-06", "2024-01-08"), ("2023-11-01", "2023-11-20")]:
+        panel = store.get_close(["T00", "T01", "T02"], start, end, now=pd.Timestamp("2024-03-05"))
+        assert panel.empty and list(panel.columns) == ["T00", "T01", "T02"]
+        assert store.last_missing == [] and fetcher.last_missing == []
+        requested = sum(n for key, n in calls.items() if key != "lock")
+
+        # Période couverte : le second appel ne redemande rien
+        store.get_close(["T00", "T01", "T02"], start, end, now=pd.Timestamp("2024-03-05"))
+        assert sum(n for key, n in calls.items() if key != "lock") == requested
+
+    assert delays == []
+    fetcher.close()
+
+
+def _stub_download_one(prices, latency):
+    # Remplace le téléchargement d'un ticker par yfinance (signature 0.2 : `ticker` en premier et
+    # résultat dans shared._DFS ; signature 1.x : contexte d'appel en premier)
+    from yfinance import shared
+
+    def download_one(*args, **kwargs):
+        if not isinstance(args[0], str):
+            context, args = args[0], args[1:]
+        else:
+            context = None
+        ticker, start, end = (list(args) + [kwargs.get("start"), kwargs.get("end")])[:3]
+        time.sleep(latency)
+        close = prices[ticker].loc[(prices.index >= pd.Timestamp(start)) & (prices.index < pd.Timestamp(end))]
+        data = pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": 0.0})
+        data.index = data.index.tz_localize("America/New_York")
+        if context is None:
+            shared._DFS[ticker.upper()] = data
+        else:
+            with context.lock:
+                context.dfs[ticker.upper()] = data
+        return data
+
+    return download_one
+
+
+def test_concurrent_batches_through_yfinance_download(monkeypatch):
+    from yfinance import multi
+
+    names = [f"Y{i:02d}" for i in range(35)]
+    prices = _prices(names)
+    monkeypatch.setattr(multi, "_download_one", _stub_download_one(prices, latency=0.01))
+    delays = []
+    fetcher = ConcurrentProvider(batch_size=5, max_workers=7, sleep=delays.append)
+
+    result = fetcher.fetch_report(names, START, END)
+
+    # Les lots simultanés ne se mélangent pas dans les résultats globaux de yfinance
+    assert result.missing == [] and delays == []
+    window = (prices.index >= START) & (prices.index < END)
+    np.testing.assert_allclose(result.prices.to_numpy(), prices.loc[window].to_numpy())
+    fetcher.close()
@@ -0,0 +1,113 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from price_store import FrameProvider, PriceStore
+
+T = pd.Timestamp
+
+
+def _provider(names=("A", "B", "C")):
+    index = pd.bdate_range("2023-11-01", "2024-06-28", name="Date")
+    values = np.random.default_rng(0).lognormal(0, 0.01, (len(index), len(names))).cumprod(axis=0)
+    return FrameProvider(pd.DataFrame(values, index=index, columns=list(names)))
+
+
+def _window(provider, tickers, start, end):
+    prices = provider.prices
+    return prices.loc[(prices.index >= T(start)) & (prices.index < T(end)), list(tickers)]
+
+
+def _meta(store, ticker):
+    with open(store._paths(ticker)[1]) as f:
+        return json.load(f)
+
+
+def test_cold_then_warm_requests(tmp_path):
+    provider = _provider()
+    store = PriceStore(str(tmp_path), provider, offline=False)
+    now = T("2024-06-01")
+
+    cold = store.get_close(["A", "B"], "2024-01-01", "2024-03-01", now=now)
+    assert provider.requests == [(("A", "B"), T("2024-01-01"), T("2024-03-01"))]
+    pd.testing.assert_frame_equal(cold, _window(provider, ["A", "B"], "2024-01-01", "2024-03-01"), check_freq=False)
+
+    # Période couverte (et bien antérieure au jour du téléchargement) : aucune requête
+    warm = store.get_close(["A", "B"], "2024-01-15", "2024-02-15", now=now)
+    assert len(provider.requests) == 1
+    pd.testing.assert_frame_equal(warm, _window(provider, ["A", "B"], "2024-01-15", "2024-02-15"), check_freq=False)
+
+
+def test_only_missing_ranges_are_requested_and_merged(tmp_path):
+    provider = _provider()
+    store = PriceStore(str(tmp_path), provider, offline=False)
+    now = T("2024-06-01")
+    store.get_close(["A", "B"], "2024-01-01", "2024-03-01", now=now)
+    provider.requests.clear()
+
+    panel = store.get_close(["A", "B", "C"], "2023-12-01", "2024-04-01", now=now)
+
+    # Les tickers ayant les mêmes périodes manquantes sont regroupés en un seul appel
+    assert provider.requests == [
+        (("A", "B"), T("2023-12-01"), T("2024-01-01")),
+        (("A", "B"), T("2024-03-01"), T("2024-04-01")),
+        (("C",), T("2023-12-01"), T("2024-04-01")),
+    ]
+    pd.testing.assert_frame_equal(panel, _window(provider, ["A", "B", "C"], "2023-12-01", "2024-04-01"),
+                                  check_freq=False)
+    assert _meta(store, "A")["start"] == T("2023-12-01").isoformat()
+    assert _meta(store, "A")["end"] == T("2024-04-01").isoformat()
+
+    provider.requests.clear()
+    store.get_close(["A", "B", "C"], "2023-12-01", "2024-04-01", now=now)
+    assert provider.requests == []
+
+
+def test_last_day_is_refreshed_once_the_ttl_expires(tmp_path):
+    provider = _provider()
+    store = PriceStore(str(tmp_path), provider, offline=False)
+    store.get_close(["A"], "2024-01-01", "2024-06-01", now=T("2024-05-15 10:00"))
+    assert provider.requests == [(("A",), T("2024-01-01"), T("2024-06-01"))]
+    # La période couverte s'arrête au jour du téléchargement, même si la demande va au-delà
+    assert _meta(store, "A")["end"] == T("2024-05-15").isoformat()
+
+    # Dans le TTL : la clôture provisoire du jour est conservée
+    store.get_close(["A"], "2024-01-01", "2024-06-01", now=T("2024-05-15 16:00"))
+    assert len(provider.requests) == 1
+
+    # TTL écoulé : seule la fin de période est redemandée et la clôture du jour est remplacée
+    provider.prices.loc["2024-05-15", "A"] = 123.0
+    panel = store.get_close(["A"], "2024-01-01", "2024-06-01", now=T("2024-05-16 09:00"))
+    assert provider.requests[1:] == [(("A",), T("2024-05-15"), T("2024-06-01"))]
+    assert panel.loc["2024-05-15", "A"] == 123.0
+    assert _meta(store, "A")["end"] == T("2024-05-16").isoformat()
+    assert _meta(store, "A")["fetched_at"] == T("2024-05-16 09:00").isoformat()
+
+
+def test_extending_the_start_keeps_the_download_date(tmp_path):
+    provider = _provider()
+    store = PriceStore(str(tmp_path), provider, offline=False)
+    store.get_close(["A"], "2024-02-01", "2024-06-01", now=T("2024-05-15 10:00"))
+
+    store.get_close(["A"], "2024-01-01", "2024-05-10", now=T("2024-05-15 11:00"))
+
+    assert provider.requests[1:] == [(("A",), T("2024-01-01"), T("2024-02-01"))]
+    assert _meta(store, "A")["fetched_at"] == T("2024-05-15 10:00").isoformat()
+
+
+def test_offline_reads_the_cache_only(tmp_path):
+    provider = _provider()
+    PriceStore(str(tmp_path), provider, offline=False).get_close(["A", "B"], "2024-01-01", "2024-03-01",
+                                                                now=T("2024-06-01"))
+    offline_provider = _provider()
+    store = PriceStore(str(tmp_path), offline_provider, offline=True)
+
+    panel = store.get_close(["A", "B", "C"], "2023-12-01", "2024-04-01", now=T("2024-06-01"))
+
+    assert offline_provider.requests == []
+    expected = _window(provider, ["A", "B"], "2024-01-01", "2024-03-01")
+    pd.testing.assert_frame_equal(panel[["A", "B"]], expected, check_freq=False)
+    assert list(panel.columns) == ["A", "B", "C"] and panel["C"].isna().all()
+    assert not os.path.exists(store._paths("C")[1])
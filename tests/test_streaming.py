@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+import streaming
+from price_store import FrameProvider
+
+
+def _market(n_days=300, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=n_days, name="Date")
+    prices = pd.DataFrame(100 * np.cumprod(1 + rng.normal(0.0004, 0.01, (n_days, 3)), axis=0), index=dates,
+                          columns=["A", "B", "^SPX"])
+    return prices[["A", "B"]], prices["^SPX"]
+
+
+def test_polling_resumes_after_the_last_known_session():
+    prices, benchmark = _market()
+    history = 250
+    stream = streaming.PortfolioStream(prices.iloc[:history], benchmark.iloc[:history])
+    feed = streaming.PollingFeed(FrameProvider(pd.concat([prices, benchmark], axis=1)), stream.tickers,
+                                 interval=0.0, max_polls=1, start=stream.last_date)
+
+    bars = [update for update in stream.run(feed) if update["type"] == "bar"]
+
+    # Une barre par séance terminée depuis l'historique (la dernière ligne est la séance en cours)
+    assert [bar["date"] for bar in bars] == list(prices.index[history:-1])
+    expected = prices.iloc[history - 1:-1].pct_change().dropna().to_numpy() @ stream.weights
+    np.testing.assert_allclose([bar["portfolio_return"] for bar in bars], expected)
+
+
+class _MissingBenchmarkProvider(FrameProvider):
+    # Premier appel sans l'indice (ticker manquant du fournisseur), puis réponses complètes
+    def fetch(self, tickers, start, end):
+        frame = super().fetch(tickers, start, end)
+        return frame.drop(columns="^SPX") if len(self.requests) == 1 else frame
+
+
+def test_polling_waits_for_the_benchmark_and_skips_unpolled_tickers():
+    prices, benchmark = _market()
+    history = 290
+    stream = streaming.PortfolioStream(prices.iloc[:history], benchmark.iloc[:history])
+    provider = _MissingBenchmarkProvider(pd.concat([prices, benchmark], axis=1))
+    # "B" n'est pas interrogé (série périodique) : il garde son dernier cours
+    feed = streaming.PollingFeed(provider, ["A"], interval=0.0, max_polls=2, start=stream.last_date)
+
+    updates = list(stream.run(feed))
+    bars = [update for update in updates if update["type"] == "bar"]
+
+    assert all(requested == ("A", "^SPX") for requested, _, _ in provider.requests)
+    assert updates[0]["type"] == "tick"
+    assert [bar["date"] for bar in bars] == list(prices.index[history:-1])
+    assert all(bar["asset_returns"]["B"] == 0 for bar in bars)
+    expected = benchmark.iloc[history - 1:-1].pct_change().dropna().to_numpy()
+    np.testing.assert_allclose([bar["benchmark_return"] for bar in bars], expected)
@@ -0,0 +1,84 @@
+# Mesure optionnelle du temps passé dans chaque étape du pipeline (téléchargement, nettoyage,
+# covariance, backtest, rendu des graphiques, ...).
+#
+# Les modules entourent leurs étapes de `with timing.stage("nom"):`. Tant qu'aucun observateur
+# n'est enregistré, l'étape ne coûte qu'un test de liste vide ; StageTimer enregistre les durées
+# le temps d'un bloc `with`, et add_hook permet de brancher tout autre observateur
+# (journalisation, export vers un outil de suivi, ...).
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+_hooks = []
+_lock = threading.Lock()
+
+
+def add_hook(callback):
+    # `callback(stage, seconds)` est appelé à la fin de chaque étape, depuis le thread qui l'exécute
+    with _lock:
+        _hooks.append(callback)
+
+
+def remove_hook(callback):
+    with _lock:
+        if callback in _hooks:
+            _hooks.remove(callback)
+
+
+@contextmanager
+def stage(name):
+    if not _hooks:
+        yield
+        return
+    begin = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - begin
+        for callback in list(_hooks):
+            callback(name, elapsed)
+
+
+def timed(name):
+    # Décorateur : tout l'appel de la fonction est compté comme l'étape `name`
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class StageTimer:
+    # Durées cumulées et nombre d'appels par étape (observateur à passer à add_hook, ou bloc `with`)
+    def __init__(self):
+        self.seconds = {}
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, name, elapsed):
+        with self._lock:
+            self.seconds[name] = self.seconds.get(name, 0.0) + elapsed
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def __enter__(self):
+        add_hook(self)
+        return self
+
+    def __exit__(self, *exc):
+        remove_hook(self)
+        return False
+
+    def reset(self):
+        with self._lock:
+            self.seconds.clear()
+            self.calls.clear()
+
+    def report(self):
+        with self._lock:
+            return pd.DataFrame({"seconds": pd.Series(self.seconds, dtype=float),
+                                 "calls": pd.Series(self.calls, dtype=int)}).sort_values("seconds", ascending=False)